@@ -0,0 +1,79 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+# Simple in-memory TTL caches for slow-changing read paths
+class TTLCache:
+    """Bounded key -> value cache whose entries expire after ttl seconds.
+
+    Keys are tuples whose first element names what they belong to (a collection or a tenant id),
+    so invalidate() can drop every entry for that name regardless of the remaining filter values.
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.entries: Dict[Tuple[Hashable, ...], Tuple[float, Any]] = {}  # key -> (cached_at, value)
+        # Sync handlers share the cache across threadpool threads; value_fn() runs outside the lock
+        self.lock = threading.Lock()
+        # Bumped by invalidate()/clear(), so a value computed across a write is not stored afterwards
+        self.generations: Dict[Hashable, int] = {}  # name -> invalidation count
+        self.clear_generation = 0
+
+    def _generation(self, name: Hashable) -> Tuple[int, int]:
+        return self.clear_generation, self.generations.get(name, 0)
+
+    def get_or_set(self, key: Tuple[Hashable, ...], value_fn: Callable[[], Any]) -> Any:
+        """Return the cached value for key, running value_fn() when it is missing or expired."""
+        with self.lock:
+            cached = self.entries.get(key)
+            generation = self._generation(key[0])
+        if cached and time.monotonic() - cached[0] < self.ttl:
+            return cached[1]
+
+        value = value_fn()
+        with self.lock:
+            if self._generation(key[0]) != generation:
+                # Invalidated while value_fn() ran: the value may predate the write, so don't keep it
+                return value
+            now = time.monotonic()
+            if len(self.entries) >= self.maxsize:
+                # Drop expired entries first; if still full, evict the oldest
+                for stale in [k for k, (cached_at, _) in self.entries.items() if now - cached_at >= self.ttl]:
+                    del self.entries[stale]
+                if len(self.entries) >= self.maxsize:
+                    del self.entries[min(self.entries, key=lambda k: self.entries[k][0])]
+            self.entries[key] = (now, value)
+        return value
+
+    def invalidate(self, *names: Hashable) -> None:
+        """Drop every entry whose key starts with one of the given names."""
+        with self.lock:
+            for name in names:
+                self.generations[name] = self.generations.get(name, 0) + 1
+            for key in [k for k in self.entries if k[0] in names]:
+                del self.entries[key]
+
+    def clear(self) -> None:
+        """Drop every entry, e.g. when shared catalog data used by all tenants' pages changes."""
+        with self.lock:
+            self.clear_generation += 1
+            # Per-name counts only need to differ from in-flight snapshots, which clear_generation already does
+            self.generations.clear()
+            self.entries.clear()
+
+# List pages only need an approximate total for the paginator, so a COUNT can be reused for a short while
+COUNT_TTL = 30  # seconds
+count_cache = TTLCache(ttl=COUNT_TTL)
+
+# Tenant sub-resource pages (products, plans, features, licenses, subscriptions), keyed by tenant id first
+TENANT_PAGE_TTL = 60  # seconds
+tenant_page_cache = TTLCache(ttl=TENANT_PAGE_TTL)
+
+def cached_count(key: Tuple[Hashable, ...], count_fn: Callable[[], int]) -> int:
+    """Return the cached total for key, e.g. ("licenses", tenant_id), running count_fn() when stale."""
+    return count_cache.get_or_set(key, count_fn)
+
+def invalidate_counts(*names: str) -> None:
+    """Drop every cached total for the named collections (all filter values)."""
+    count_cache.invalidate(*names)
@@ -1,10 +1,61 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from typing import List, Optional
+from sqlalchemy.orm import Session, raiseload
+from sqlalchemy import and_, exists, func, select
+from typing import Callable, List, Optional, Tuple
+import calendar
+import os
 from uuid import UUID, uuid4
 from app import models, schemas
+from app.cache import cached_count, invalidate_counts, tenant_page_cache
 from app.crypto_utils import generate_license_keypair, der_to_pem_public_key
 
+# In development/test, make lazy relationship loads raise so N+1 access patterns fail loudly
+DEV_RAISELOAD = os.getenv("DEV_RAISELOAD", "false").lower() == "true"
+
+def strict_query(db: Session, *entities):
+    """db.query(...) that raises on lazy relationship loads when DEV_RAISELOAD is set.
+
+    Relationships a caller needs must be loaded explicitly (e.g. selectinload).
+    """
+    query = db.query(*entities)
+    if DEV_RAISELOAD:
+        query = query.options(raiseload('*'))
+    return query
+
+def page_with_total(query, skip: int, limit: int) -> Tuple[list, int]:
+    """Fetch one page of an ORM query and the unpaginated total in a single statement.
+
+    COUNT(*) OVER() is evaluated before LIMIT/OFFSET, so every row carries the full total.
+    A page past the end has no rows to carry it and falls back to a plain COUNT.
+    """
+    rows = query.add_columns(func.count().over().label("total")).offset(skip).limit(limit).all()
+    if not rows:
+        return [], (query.order_by(None).count() if skip else 0)
+    return [row[0] for row in rows], rows[0].total
+
+def compute_total(items: list, skip: int, size: int, count_fn: Callable[[], int]) -> int:
+    """Total for a page without a COUNT when the page itself proves where the results end.
+
+    A short page that has rows (or an empty first page) is the last one, so the total is skip + len(items).
+    """
+    if len(items) < size and (items or not skip):
+        return skip + len(items)
+    return count_fn()
+
+def keyset_page(query, id_column, after: Optional[str], limit: int) -> Tuple[list, Optional[str]]:
+    """One page ordered by id_column, starting after the given id instead of scanning OFFSET rows.
+
+    One extra row is fetched to tell whether another page follows; next_cursor is None on the last page.
+    """
+    if after:
+        query = query.filter(id_column > after)
+    rows = query.order_by(id_column).limit(limit + 1).all()
+    next_cursor = getattr(rows[limit - 1], id_column.key) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def rows_exist(db: Session, *criteria) -> tuple:
+    """Evaluate one EXISTS per criterion in a single round trip, e.g. rows_exist(db, Tenant.id == a, PlanDefinition.id == b)."""
+    return tuple(db.execute(select(*(exists().where(criterion) for criterion in criteria))).one())
+
 # Tenant CRUD
 def get_tenant(db: Session, tenant_id: UUID) -> Optional[models.Tenant]:
     return db.query(models.Tenant).filter(models.Tenant.id == str(tenant_id)).first()
@@ -15,10 +66,17 @@ def get_tenant_by_slug(db: Session, slug: str) -> Optional[models.Tenant]:
 def get_tenants(db: Session, skip: int = 0, limit: int = 100) -> List[models.Tenant]:
     return db.query(models.Tenant).offset(skip).limit(limit).all()
 
+def get_tenants_with_total(db: Session, skip: int = 0, limit: int = 100) -> Tuple[List[models.Tenant], int]:
+    return page_with_total(db.query(models.Tenant), skip, limit)
+
+def count_tenants(db: Session) -> int:
+    return db.query(models.Tenant).count()
+
 def create_tenant(db: Session, tenant: schemas.TenantCreate) -> models.Tenant:
     db_tenant = models.Tenant(**tenant.model_dump())
     db.add(db_tenant)
     db.commit()
+    invalidate_counts("tenants")
     db.refresh(db_tenant)
     return db_tenant
 
@@ -29,6 +87,7 @@ def update_tenant(db: Session, tenant_id: UUID, tenant_update: schemas.TenantUpd
         for field, value in update_data.items():
             setattr(db_tenant, field, value)
         db.commit()
+        tenant_page_cache.invalidate(db_tenant.id)
         db.refresh(db_tenant)
     return db_tenant
 
@@ -37,6 +96,8 @@ def delete_tenant(db: Session, tenant_id: UUID) -> bool:
     if db_tenant:
         db.delete(db_tenant)
         db.commit()
+        tenant_page_cache.invalidate(str(tenant_id))
+        invalidate_counts("tenants", "licenses")
         return True
     return False
 
@@ -47,10 +108,17 @@ def get_template(db: Session, template_id: UUID) -> Optional[models.Template]:
 def get_templates(db: Session, skip: int = 0, limit: int = 100) -> List[models.Template]:
     return db.query(models.Template).offset(skip).limit(limit).all()
 
+def get_templates_with_total(db: Session, skip: int = 0, limit: int = 100) -> Tuple[List[models.Template], int]:
+    return page_with_total(db.query(models.Template), skip, limit)
+
+def count_templates(db: Session) -> int:
+    return db.query(models.Template).count()
+
 def create_template(db: Session, template: schemas.TemplateCreate) -> models.Template:
     db_template = models.Template(**template.model_dump())
     db.add(db_template)
     db.commit()
+    invalidate_counts("templates")
     db.refresh(db_template)
     return db_template
 
@@ -69,10 +137,21 @@ def delete_template(db: Session, template_id: UUID) -> bool:
     if db_template:
         db.delete(db_template)
         db.commit()
+        invalidate_counts("templates")
         return True
     return False
 
 # License CRUD
+def plan_validity_days(billing_interval: Optional[str], issue_date) -> Optional[int]:
+    """Days covered by one billing period starting at issue_date, or None for an unknown interval."""
+    if billing_interval == 'monthly':
+        # Actual number of days in the month of issue_date
+        return calendar.monthrange(issue_date.year, issue_date.month)[1]
+    if billing_interval == 'yearly':
+        # Days from issue_date to the same date next year
+        return (issue_date.replace(year=issue_date.year + 1) - issue_date).days
+    return None
+
 def get_license(db: Session, license_id: UUID) -> Optional[models.License]:
     return db.query(models.License).filter(models.License.id == str(license_id)).first()
 
@@ -107,26 +186,13 @@ def create_license(db: Session, license: schemas.LicenseCreate) -> models.Licens
 
         # Calculate validity_days from subscription end_date - issue_date
         if subscription.end_date:
-            from datetime import timedelta
             validity_period = subscription.end_date - subscription.issue_date
             license_data['validity_days'] = validity_period.days
         else:
             # If no end_date, calculate based on plan's billing interval and issue_date
             plan = get_plan_definition(db, subscription.plan_id)
             if plan and subscription.issue_date:
-                if plan.billing_interval == 'monthly':
-                    # Use actual number of days in the month of issue_date
-                    import calendar
-                    year = subscription.issue_date.year
-                    month = subscription.issue_date.month
-                    license_data['validity_days'] = calendar.monthrange(year, month)[1]
-                elif plan.billing_interval == 'yearly':
-                    # Calculate days from issue_date to same date next year
-                    from datetime import timedelta
-                    next_year_date = subscription.issue_date.replace(year=subscription.issue_date.year + 1)
-                    license_data['validity_days'] = (next_year_date - subscription.issue_date).days
-                else:
-                    license_data['validity_days'] = 30  # Default to monthly
+                license_data['validity_days'] = plan_validity_days(plan.billing_interval, subscription.issue_date) or 30
             else:
                 license_data['validity_days'] = 30  # Default fallback
 
@@ -139,39 +205,62 @@ def create_license(db: Session, license: schemas.LicenseCreate) -> models.Licens
     db.add(db_license)
     db.commit()
     db.refresh(db_license)
+    invalidate_counts("licenses")
+    tenant_page_cache.invalidate(db_license.tenant_id)
     return db_license
 
 def update_license(db: Session, license_id: UUID, license_update: schemas.LicenseUpdate) -> Optional[models.License]:
     db_license = db.query(models.License).filter(models.License.id == str(license_id)).first()
     if db_license:
+        previous_tenant_id = db_license.tenant_id
         update_data = license_update.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_license, field, value)
         db.commit()
+        invalidate_counts("licenses")
+        tenant_page_cache.invalidate(previous_tenant_id, str(db_license.tenant_id))
         db.refresh(db_license)
     return db_license
 
 def delete_license(db: Session, license_id: UUID) -> bool:
     db_license = db.query(models.License).filter(models.License.id == str(license_id)).first()
     if db_license:
+        tenant_id = db_license.tenant_id
         db.delete(db_license)
         db.commit()
+        invalidate_counts("licenses")
+        tenant_page_cache.invalidate(tenant_id)
         return True
     return False
 
 def get_tenant_license_count(db: Session, tenant_id: UUID) -> int:
     return db.query(models.License).filter(models.License.tenant_id == str(tenant_id)).count()
 
-def get_licenses_with_tenant(db: Session, skip: int = 0, limit: int = 100, tenant_id: Optional[UUID] = None) -> List[schemas.LicenseResponse]:
-    """Get licenses with tenant names included."""
+def _licenses_with_tenant_query(db: Session, tenant_id: Optional[UUID] = None):
     from sqlalchemy.orm import joinedload
 
     query = db.query(models.License).options(joinedload(models.License.tenant))
     if tenant_id:
         query = query.filter(models.License.tenant_id == str(tenant_id))
+    return query
+
+def get_licenses_with_tenant(db: Session, skip: int = 0, limit: int = 100, tenant_id: Optional[UUID] = None) -> List[schemas.LicenseResponse]:
+    """Get licenses with tenant names included."""
+    licenses = _licenses_with_tenant_query(db, tenant_id).offset(skip).limit(limit).all()
+    return license_responses(db, licenses)
 
-    licenses = query.offset(skip).limit(limit).all()
+def get_licenses_with_tenant_and_total(db: Session, skip: int = 0, limit: int = 100, tenant_id: Optional[UUID] = None) -> Tuple[List[schemas.LicenseResponse], int]:
+    """Get one page of licenses with tenant names, plus the filtered total, in one query."""
+    licenses, total = page_with_total(_licenses_with_tenant_query(db, tenant_id), skip, limit)
+    return license_responses(db, licenses), total
 
+def get_licenses_with_tenant_after(db: Session, after: Optional[str] = None, limit: int = 100, tenant_id: Optional[UUID] = None) -> Tuple[List[schemas.LicenseResponse], Optional[str]]:
+    """Keyset page of licenses with tenant names, ordered by id; returns (licenses, next_cursor)."""
+    licenses, next_cursor = keyset_page(_licenses_with_tenant_query(db, tenant_id), models.License.id, after, limit)
+    return license_responses(db, licenses), next_cursor
+
+def license_responses(db: Session, licenses: List[models.License]) -> List[schemas.LicenseResponse]:
+    """Convert licenses (tenant loaded) to LicenseResponse with tenant names."""
     # Convert to LicenseResponse with tenant names (keys are base64-encoded DER)
     result = []
     for license in licenses:
@@ -182,23 +271,12 @@ def get_licenses_with_tenant(db: Session, skip: int = 0, limit: int = 100, tenan
             if subscription:
                 # Use same logic as create_license
                 if subscription.end_date:
-                    from datetime import timedelta
                     validity_period = subscription.end_date - subscription.issue_date
                     validity_days = validity_period.days
                 elif subscription.plan and subscription.issue_date:
                     plan = get_plan_definition(db, subscription.plan_id)
                     if plan:
-                        if plan.billing_interval == 'monthly':
-                            # Use actual number of days in the month of issue_date
-                            import calendar
-                            year = subscription.issue_date.year
-                            month = subscription.issue_date.month
-                            validity_days = calendar.monthrange(year, month)[1]
-                        elif plan.billing_interval == 'yearly':
-                            # Calculate days from issue_date to same date next year
-                            from datetime import timedelta
-                            next_year_date = subscription.issue_date.replace(year=subscription.issue_date.year + 1)
-                            validity_days = (next_year_date - subscription.issue_date).days
+                        validity_days = plan_validity_days(plan.billing_interval, subscription.issue_date) or validity_days
 
         license_dict = {
             "id": license.id,
@@ -233,23 +311,12 @@ def get_license_with_tenant(db: Session, license_id: UUID) -> Optional[schemas.L
         if subscription:
             # Use same logic as create_license
             if subscription.end_date:
-                from datetime import timedelta
                 validity_period = subscription.end_date - subscription.issue_date
                 validity_days = validity_period.days
             elif subscription.plan and subscription.issue_date:
                 plan = get_plan_definition(db, subscription.plan_id)
                 if plan:
-                    if plan.billing_interval == 'monthly':
-                        # Use actual number of days in the month of issue_date
-                        import calendar
-                        year = subscription.issue_date.year
-                        month = subscription.issue_date.month
-                        validity_days = calendar.monthrange(year, month)[1]
-                    elif plan.billing_interval == 'yearly':
-                        # Calculate days from issue_date to same date next year
-                        from datetime import timedelta
-                        next_year_date = subscription.issue_date.replace(year=subscription.issue_date.year + 1)
-                        validity_days = (next_year_date - subscription.issue_date).days
+                    validity_days = plan_validity_days(plan.billing_interval, subscription.issue_date) or validity_days
 
     # Keys are base64-encoded DER as-is
     license_dict = {
@@ -287,6 +354,8 @@ def create_license_from_form(db: Session, tenant_id: UUID, issued_at, validity_d
     db.add(db_license)
     db.commit()
     db.refresh(db_license)
+    invalidate_counts("licenses")
+    tenant_page_cache.invalidate(db_license.tenant_id)
     return db_license
 
 # Helper function to update license from form data
@@ -409,14 +478,26 @@ def create_default_admin(db: Session) -> models.User:
 def get_product(db: Session, product_id: UUID) -> Optional[models.Product]:
     return db.query(models.Product).filter(models.Product.id == str(product_id)).first()
 
+def get_product_count(db: Session) -> int:
+    """Total number of products, cached for cache.COUNT_TTL seconds."""
+    return cached_count(("products",), db.query(models.Product).count)
+
+def invalidate_product_count() -> None:
+    invalidate_counts("products")
+
 def get_products(db: Session, skip: int = 0, limit: int = 100) -> List[models.Product]:
     return db.query(models.Product).offset(skip).limit(limit).all()
 
+def get_products_after(db: Session, after: Optional[str] = None, limit: int = 100) -> Tuple[List[models.Product], Optional[str]]:
+    """Keyset page of products ordered by id; returns (products, next_cursor)."""
+    return keyset_page(db.query(models.Product), models.Product.id, after, limit)
+
 def create_product(db: Session, product: schemas.ProductCreate) -> models.Product:
     db_product = models.Product(**product.model_dump())
     db.add(db_product)
     db.commit()
     db.refresh(db_product)
+    invalidate_product_count()
     return db_product
 
 def update_product(db: Session, product_id: UUID, product_update: schemas.ProductUpdate) -> Optional[models.Product]:
@@ -426,6 +507,7 @@ def update_product(db: Session, product_id: UUID, product_update: schemas.Produc
         for field, value in update_data.items():
             setattr(db_product, field, value)
         db.commit()
+        tenant_page_cache.clear()
         db.refresh(db_product)
     return db_product
 
@@ -434,6 +516,8 @@ def delete_product(db: Session, product_id: UUID) -> bool:
     if db_product:
         db.delete(db_product)
         db.commit()
+        invalidate_product_count()
+        tenant_page_cache.clear()
         return True
     return False
 
@@ -447,6 +531,12 @@ def get_plan_definitions(db: Session, product_id: Optional[UUID] = None, skip: i
         query = query.filter(models.PlanDefinition.product_id == str(product_id))
     return query.offset(skip).limit(limit).all()
 
+def count_plan_definitions(db: Session, product_id: Optional[UUID] = None) -> int:
+    query = db.query(models.PlanDefinition)
+    if product_id:
+        query = query.filter(models.PlanDefinition.product_id == str(product_id))
+    return query.count()
+
 def get_plan_definitions_with_product(db: Session, product_id: Optional[UUID] = None, skip: int = 0, limit: int = 100) -> List[dict]:
     """Get plan definitions with product names included."""
     from sqlalchemy.orm import joinedload
@@ -458,7 +548,35 @@ def get_plan_definitions_with_product(db: Session, product_id: Optional[UUID] =
         query = query.filter(models.PlanDefinition.product_id == str(product_id))
 
     plans = query.offset(skip).limit(limit).all()
+    return plan_dicts(plans)
+
+def get_tenant_products_with_total(db: Session, tenant_id: UUID, skip: int = 0, limit: int = 100) -> Tuple[List[models.Product], int]:
+    """Get one page of the products a tenant has subscriptions to, plus the total, in one query."""
+    # Correlated EXISTS (a semi-join): no duplicate products, so COUNT(*) OVER() stays exact
+    query = db.query(models.Product).filter(exists().where(
+        models.PlanDefinition.product_id == models.Product.id,
+        models.Subscription.plan_id == models.PlanDefinition.id,
+        models.Subscription.tenant_id == str(tenant_id)
+    ))
+    return page_with_total(query, skip, limit)
+
+def get_tenant_plans_with_product(db: Session, tenant_id: UUID, skip: int = 0, limit: int = 100) -> Tuple[List[dict], int]:
+    """Get one page of the plans a tenant is subscribed to (with product names), plus the total."""
+    from sqlalchemy.orm import joinedload
 
+    # Correlated EXISTS rather than JOIN + DISTINCT: COUNT(*) OVER() is evaluated before DISTINCT
+    query = db.query(models.PlanDefinition).options(
+        joinedload(models.PlanDefinition.product)
+    ).filter(exists().where(
+        models.Subscription.plan_id == models.PlanDefinition.id,
+        models.Subscription.tenant_id == str(tenant_id)
+    ))
+
+    plans, total = page_with_total(query, skip, limit)
+    return plan_dicts(plans), total
+
+def plan_dicts(plans: List[models.PlanDefinition]) -> List[dict]:
+    """Convert plan definitions (product loaded) to dicts with product names."""
     # Convert to dict with additional fields
     result = []
     for plan in plans:
@@ -480,6 +598,7 @@ def create_plan_definition(db: Session, plan: schemas.PlanDefinitionCreate) -> m
     db_plan = models.PlanDefinition(**plan.model_dump())
     db.add(db_plan)
     db.commit()
+    invalidate_counts("plans")
     db.refresh(db_plan)
     return db_plan
 
@@ -490,6 +609,8 @@ def update_plan_definition(db: Session, plan_id: UUID, plan_update: schemas.Plan
         for field, value in update_data.items():
             setattr(db_plan, field, value)
         db.commit()
+        invalidate_counts("plans")
+        tenant_page_cache.clear()
         db.refresh(db_plan)
     return db_plan
 
@@ -498,6 +619,8 @@ def delete_plan_definition(db: Session, plan_id: UUID) -> bool:
     if db_plan:
         db.delete(db_plan)
         db.commit()
+        invalidate_counts("plans")
+        tenant_page_cache.clear()
         return True
     return False
 
@@ -511,6 +634,12 @@ def get_feature_definitions(db: Session, product_id: Optional[UUID] = None, skip
         query = query.filter(models.FeatureDefinition.product_id == str(product_id))
     return query.offset(skip).limit(limit).all()
 
+def count_feature_definitions(db: Session, product_id: Optional[UUID] = None) -> int:
+    query = db.query(models.FeatureDefinition)
+    if product_id:
+        query = query.filter(models.FeatureDefinition.product_id == str(product_id))
+    return query.count()
+
 def get_feature_definitions_with_product(db: Session, product_id: Optional[UUID] = None, skip: int = 0, limit: int = 100) -> List[dict]:
     """Get feature definitions with product names included."""
     from sqlalchemy.orm import joinedload
@@ -522,7 +651,25 @@ def get_feature_definitions_with_product(db: Session, product_id: Optional[UUID]
         query = query.filter(models.FeatureDefinition.product_id == str(product_id))
 
     features = query.offset(skip).limit(limit).all()
+    return feature_dicts(features)
+
+def get_tenant_features_with_product(db: Session, tenant_id: UUID, skip: int = 0, limit: int = 100) -> Tuple[List[dict], int]:
+    """Get one page of the features of products a tenant is subscribed to (with product names), plus the total."""
+    from sqlalchemy.orm import joinedload
+
+    query = db.query(models.FeatureDefinition).options(
+        joinedload(models.FeatureDefinition.product)
+    ).filter(exists().where(
+        models.PlanDefinition.product_id == models.FeatureDefinition.product_id,
+        models.Subscription.plan_id == models.PlanDefinition.id,
+        models.Subscription.tenant_id == str(tenant_id)
+    ))
 
+    features, total = page_with_total(query, skip, limit)
+    return feature_dicts(features), total
+
+def feature_dicts(features: List[models.FeatureDefinition]) -> List[dict]:
+    """Convert feature definitions (product loaded) to dicts with product names."""
     # Convert to dict with additional fields
     result = []
     for feature in features:
@@ -543,6 +690,8 @@ def create_feature_definition(db: Session, feature: schemas.FeatureDefinitionCre
     db_feature = models.FeatureDefinition(**feature.model_dump())
     db.add(db_feature)
     db.commit()
+    invalidate_counts("features")
+    tenant_page_cache.clear()
     db.refresh(db_feature)
     return db_feature
 
@@ -553,6 +702,8 @@ def update_feature_definition(db: Session, feature_id: UUID, feature_update: sch
         for field, value in update_data.items():
             setattr(db_feature, field, value)
         db.commit()
+        invalidate_counts("features")
+        tenant_page_cache.clear()
         db.refresh(db_feature)
     return db_feature
 
@@ -561,6 +712,8 @@ def delete_feature_definition(db: Session, feature_id: UUID) -> bool:
     if db_feature:
         db.delete(db_feature)
         db.commit()
+        invalidate_counts("features")
+        tenant_page_cache.clear()
         return True
     return False
 
@@ -615,36 +768,46 @@ def get_subscriptions(db: Session, tenant_id: Optional[UUID] = None, skip: int =
         query = query.filter(models.Subscription.tenant_id == str(tenant_id))
     return query.offset(skip).limit(limit).all()
 
-def get_subscriptions_with_details(db: Session, tenant_id: Optional[UUID] = None, skip: int = 0, limit: int = 100) -> List[dict]:
-    """Get subscriptions with tenant and plan names included."""
+def _subscriptions_with_details_query(db: Session, tenant_id: Optional[UUID] = None):
     from sqlalchemy.orm import joinedload
 
+    # Eager-load only the related columns subscription_details() reads
     query = db.query(models.Subscription).options(
-        joinedload(models.Subscription.tenant),
-        joinedload(models.Subscription.plan)
+        joinedload(models.Subscription.tenant).load_only(models.Tenant.name),
+        joinedload(models.Subscription.plan).load_only(models.PlanDefinition.name, models.PlanDefinition.billing_interval)
     )
     if tenant_id:
         query = query.filter(models.Subscription.tenant_id == str(tenant_id))
+    return query
+
+def get_subscriptions_with_details(db: Session, tenant_id: Optional[UUID] = None, skip: int = 0, limit: int = 100) -> List[dict]:
+    """Get subscriptions with tenant and plan names included."""
+    subscriptions = _subscriptions_with_details_query(db, tenant_id).offset(skip).limit(limit).all()
+    return subscription_details(subscriptions)
 
-    subscriptions = query.offset(skip).limit(limit).all()
+def get_subscriptions_with_total(db: Session, tenant_id: Optional[UUID] = None, skip: int = 0, limit: int = 100) -> Tuple[List[models.Subscription], int]:
+    """Get one page of subscriptions (tenant and plan loaded), plus the filtered total, in one query."""
+    return page_with_total(_subscriptions_with_details_query(db, tenant_id), skip, limit)
+
+def get_subscriptions_after(db: Session, tenant_id: Optional[UUID] = None, after: Optional[str] = None, limit: int = 100) -> Tuple[List[models.Subscription], Optional[str]]:
+    """Keyset page of subscriptions (tenant and plan loaded), ordered by id; returns (subscriptions, next_cursor)."""
+    return keyset_page(_subscriptions_with_details_query(db, tenant_id), models.Subscription.id, after, limit)
+
+def count_subscriptions(db: Session, tenant_id: Optional[UUID] = None) -> int:
+    query = db.query(models.Subscription)
+    if tenant_id:
+        query = query.filter(models.Subscription.tenant_id == str(tenant_id))
+    return query.count()
 
+def subscription_details(subscriptions: List[models.Subscription]) -> List[dict]:
+    """Convert subscriptions (tenant and plan loaded) to dicts with tenant and plan names."""
     # Convert to dict with additional fields
     result = []
     for subscription in subscriptions:
         # Calculate validity_days based on plan's billing interval and issue_date
         validity_days = None
         if subscription.plan and subscription.issue_date:
-            if subscription.plan.billing_interval == "monthly":
-                # Use actual number of days in the month of issue_date
-                import calendar
-                year = subscription.issue_date.year
-                month = subscription.issue_date.month
-                validity_days = calendar.monthrange(year, month)[1]
-            elif subscription.plan.billing_interval == "yearly":
-                # Calculate days from issue_date to same date next year minus 1 day
-                from datetime import timedelta
-                next_year_date = subscription.issue_date.replace(year=subscription.issue_date.year + 1)
-                validity_days = (next_year_date - subscription.issue_date).days
+            validity_days = plan_validity_days(subscription.plan.billing_interval, subscription.issue_date)
 
         subscription_dict = {
             "id": subscription.id,
@@ -678,6 +841,8 @@ def create_subscription(db: Session, subscription: schemas.SubscriptionCreate) -
     db.add(db_subscription)
     db.commit()
     db.refresh(db_subscription)
+    invalidate_counts("subscriptions")
+    tenant_page_cache.invalidate(db_subscription.tenant_id)
 
     # Create entitlements based on plan features
     plan = get_plan_definition(db, subscription.plan_id)
@@ -693,16 +858,20 @@ def create_subscription(db: Session, subscription: schemas.SubscriptionCreate) -
             )
             db.add(entitlement)
         db.commit()
+        invalidate_counts("entitlements")
 
     return db_subscription
 
 def update_subscription(db: Session, subscription_id: UUID, subscription_update: schemas.SubscriptionUpdate) -> Optional[models.Subscription]:
     db_subscription = db.query(models.Subscription).filter(models.Subscription.id == str(subscription_id)).first()
     if db_subscription:
+        previous_tenant_id = db_subscription.tenant_id
         update_data = subscription_update.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_subscription, field, value)
         db.commit()
+        invalidate_counts("subscriptions")
+        tenant_page_cache.invalidate(previous_tenant_id, str(db_subscription.tenant_id))
         db.refresh(db_subscription)
 
         # If the plan was changed, we don't need to update licenses since they now calculate validity_days dynamically
@@ -713,8 +882,11 @@ def update_subscription(db: Session, subscription_id: UUID, subscription_update:
 def delete_subscription(db: Session, subscription_id: UUID) -> bool:
     db_subscription = db.query(models.Subscription).filter(models.Subscription.id == str(subscription_id)).first()
     if db_subscription:
+        tenant_id = db_subscription.tenant_id
         db.delete(db_subscription)
         db.commit()
+        invalidate_counts("subscriptions", "entitlements")
+        tenant_page_cache.invalidate(tenant_id)
         return True
     return False
 
@@ -734,9 +906,13 @@ def get_subscription_entitlements_with_details(db: Session, subscription_id: Opt
     """Get subscription entitlements with feature keys and billing information included."""
     from sqlalchemy.orm import joinedload
 
+    # Eager-load only the related columns read below, so the page stays one query without fetching whole rows
     query = db.query(models.SubscriptionEntitlement).options(
-        joinedload(models.SubscriptionEntitlement.feature),
-        joinedload(models.SubscriptionEntitlement.subscription).joinedload(models.Subscription.plan)
+        joinedload(models.SubscriptionEntitlement.feature).load_only(models.FeatureDefinition.key),
+        joinedload(models.SubscriptionEntitlement.subscription)
+        .load_only(models.Subscription.issue_date)
+        .joinedload(models.Subscription.plan)
+        .load_only(models.PlanDefinition.billing_interval)
     )
     if subscription_id:
         query = query.filter(models.SubscriptionEntitlement.subscription_id == str(subscription_id))
@@ -753,17 +929,7 @@ def get_subscription_entitlements_with_details(db: Session, subscription_id: Opt
             billing_interval = entitlement.subscription.plan.billing_interval
             issue_date = entitlement.subscription.issue_date
             if issue_date:
-                if billing_interval == "monthly":
-                    # Use actual number of days in the month of issue_date
-                    import calendar
-                    year = issue_date.year
-                    month = issue_date.month
-                    validity_days = calendar.monthrange(year, month)[1]
-                elif billing_interval == "yearly":
-                    # Calculate days from issue_date to same date next year minus 1 day
-                    from datetime import timedelta
-                    next_year_date = issue_date.replace(year=issue_date.year + 1)
-                    validity_days = (next_year_date - issue_date).days
+                validity_days = plan_validity_days(billing_interval, issue_date)
 
         entitlement_dict = {
             "subscription_id": entitlement.subscription_id,
@@ -782,6 +948,7 @@ def create_subscription_entitlement(db: Session, entitlement: schemas.Subscripti
     db_entitlement = models.SubscriptionEntitlement(**entitlement.model_dump())
     db.add(db_entitlement)
     db.commit()
+    invalidate_counts("entitlements")
     db.refresh(db_entitlement)
     return db_entitlement
 
@@ -804,5 +971,6 @@ def delete_subscription_entitlement(db: Session, subscription_id: UUID, feature_
     if db_entitlement:
         db.delete(db_entitlement)
         db.commit()
+        invalidate_counts("entitlements")
         return True
     return False
@@ -1,10 +1,35 @@
+import os
 import uuid
 import base64
+from functools import lru_cache
 from cryptography.hazmat.primitives import serialization, hashes
 from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.backends import default_backend
 
 
+# Parsed key objects, keyed by their encoded form, so repeated calls with the same key skip
+# parsing it and rebuilding the OpenSSL key; only the RSA operation itself runs
+@lru_cache(maxsize=16)
+def _load_public_key_pem(public_key_pem: str):
+    return serialization.load_pem_public_key(public_key_pem.encode('utf-8'), backend=default_backend())
+
+
+@lru_cache(maxsize=16)
+def _load_private_key_pem(private_key_pem: str):
+    return serialization.load_pem_private_key(private_key_pem.encode('utf-8'), password=None, backend=default_backend())
+
+
+@lru_cache(maxsize=256)
+def _load_public_key_der(public_key_b64: str):
+    return serialization.load_der_public_key(base64.b64decode(public_key_b64), backend=default_backend())
+
+
+@lru_cache(maxsize=256)
+def _load_private_key_der(private_key_b64: str):
+    return serialization.load_der_private_key(base64.b64decode(private_key_b64), password=None, backend=default_backend())
+
+
 def generate_license_keypair() -> tuple[str, str]:
     """Generate a license key pair (public key, private key) as base64-encoded DER."""
     # Generate RSA private key
@@ -61,14 +86,7 @@ def sign_payload(payload: str, license_secret: str) -> str:
     from cryptography.hazmat.primitives import hashes
     from cryptography.hazmat.primitives.asymmetric import padding
 
-    # Decode base64 to get DER bytes
-    private_der = base64.b64decode(license_secret)
-
-    private_key = serialization.load_der_private_key(
-        private_der,
-        password=None,
-        backend=default_backend()
-    )
+    private_key = _load_private_key_der(license_secret)
 
     signature = private_key.sign(
         payload.encode('utf-8'),
@@ -87,13 +105,7 @@ def verify_signature(payload: str, signature: str, license_key: str) -> bool:
     from cryptography.hazmat.primitives import hashes
     from cryptography.hazmat.primitives.asymmetric import padding
 
-    # Decode base64 to get DER bytes
-    public_der = base64.b64decode(license_key)
-
-    public_key = serialization.load_der_public_key(
-        public_der,
-        backend=default_backend()
-    )
+    public_key = _load_public_key_der(license_key)
 
     try:
         public_key.verify(
@@ -111,48 +123,13 @@ def verify_signature(payload: str, signature: str, license_key: str) -> bool:
 
 
 def encrypt_payload(payload: str, public_key_pem: str) -> str:
-    """Encrypt a payload using the public key."""
-    from cryptography.hazmat.primitives import hashes
-    from cryptography.hazmat.primitives.asymmetric import padding
-
-    public_key = serialization.load_pem_public_key(
-        public_key_pem.encode('utf-8'),
-        backend=default_backend()
-    )
-
-    encrypted = public_key.encrypt(
-        payload.encode('utf-8'),
-        padding.OAEP(
-            mgf=padding.MGF1(algorithm=hashes.SHA256()),
-            algorithm=hashes.SHA256(),
-            label=None
-        )
-    )
-
-    return base64.b64encode(encrypted).decode('utf-8')
+    """Encrypt a payload of any size using the PEM public key (hybrid AES-GCM + RSA-OAEP, see hybrid_encrypt)."""
+    return _hybrid_seal(payload, _load_public_key_pem(public_key_pem))
 
 
 def decrypt_payload(encrypted_payload: str, license_secret: str) -> str:
-    """Decrypt a payload using the private key."""
-    from cryptography.hazmat.primitives import hashes
-    from cryptography.hazmat.primitives.asymmetric import padding
-
-    private_key = serialization.load_pem_private_key(
-        license_secret.encode('utf-8'),
-        password=None,
-        backend=default_backend()
-    )
-
-    decrypted = private_key.decrypt(
-        base64.b64decode(encrypted_payload),
-        padding.OAEP(
-            mgf=padding.MGF1(algorithm=hashes.SHA256()),
-            algorithm=hashes.SHA256(),
-            label=None
-        )
-    )
-
-    return decrypted.decode('utf-8')
+    """Decrypt a payload produced by encrypt_payload using the PEM private key."""
+    return _hybrid_open(encrypted_payload, _load_private_key_pem(license_secret))
 
 
 def der_to_pem_public_key(der_b64: str) -> str:
@@ -208,8 +185,7 @@ def rsa_encrypt(data: str, public_key_b64: str) -> str:
     from cryptography.hazmat.primitives.asymmetric import padding
     from cryptography.hazmat.primitives import hashes
 
-    public_der = base64.b64decode(public_key_b64)
-    public_key = serialization.load_der_public_key(public_der, backend=default_backend())
+    public_key = _load_public_key_der(public_key_b64)
 
     encrypted = public_key.encrypt(
         data.encode('utf-8'),
@@ -226,8 +202,7 @@ def rsa_decrypt(encrypted_b64: str, private_key_b64: str) -> str:
     from cryptography.hazmat.primitives.asymmetric import padding
     from cryptography.hazmat.primitives import hashes
 
-    private_der = base64.b64decode(private_key_b64)
-    private_key = serialization.load_der_private_key(private_der, password=None, backend=default_backend())
+    private_key = _load_private_key_der(private_key_b64)
 
     encrypted = base64.b64decode(encrypted_b64)
     decrypted = private_key.decrypt(
@@ -242,28 +217,24 @@ def rsa_decrypt(encrypted_b64: str, private_key_b64: str) -> str:
 
 def hybrid_encrypt(data: str, rsa_public_key_b64: str) -> str:
     """Encrypt data using hybrid encryption (AES + RSA)."""
-    from cryptography.hazmat.primitives.ciphers import algorithms, modes
-    from cryptography.hazmat.primitives import ciphers
+    return _hybrid_seal(data, _load_public_key_der(rsa_public_key_b64))
+
+def _hybrid_seal(data: str, rsa_public_key) -> str:
+    """AES-GCM encrypt data under a fresh key and RSA-OAEP wrap only that 32-byte key."""
     from cryptography.hazmat.primitives.asymmetric import padding
-    import os
 
     # Generate a random AES key and IV
-    aes_key = os.urandom(32)  # 256-bit AES key
+    aes_key = AESGCM.generate_key(bit_length=256)
     iv = os.urandom(12)  # 96-bit IV for GCM
 
-    # Encrypt data with AES-GCM
-    cipher = ciphers.Cipher(algorithms.AES(aes_key), modes.GCM(iv))
-    encryptor = cipher.encryptor()
-    ciphertext = encryptor.update(data.encode('utf-8')) + encryptor.finalize()
-    tag = encryptor.tag
+    # Encrypt data with AES-GCM (one-shot AEAD; output is ciphertext followed by the 16-byte tag)
+    sealed = AESGCM(aes_key).encrypt(iv, data.encode('utf-8'), None)
+    ciphertext, tag = sealed[:-16], sealed[-16:]
 
     # Combine IV + tag + ciphertext
     aes_encrypted = iv + tag + ciphertext
 
     # Encrypt AES key with RSA
-    rsa_public_der = base64.b64decode(rsa_public_key_b64)
-    rsa_public_key = serialization.load_der_public_key(rsa_public_der, backend=default_backend())
-
     encrypted_aes_key = rsa_public_key.encrypt(
         aes_key,
         padding.OAEP(
@@ -278,8 +249,10 @@ def hybrid_encrypt(data: str, rsa_public_key_b64: str) -> str:
 
 def hybrid_decrypt(encrypted_data: str, rsa_private_key_b64: str) -> str:
     """Decrypt data using hybrid decryption (AES + RSA)."""
-    from cryptography.hazmat.primitives.ciphers import algorithms, modes
-    from cryptography.hazmat.primitives import ciphers
+    return _hybrid_open(encrypted_data, _load_private_key_der(rsa_private_key_b64))
+
+def _hybrid_open(encrypted_data: str, rsa_private_key) -> str:
+    """Reverse _hybrid_seal: RSA-OAEP unwrap the AES key, then AES-GCM decrypt and authenticate."""
     from cryptography.hazmat.primitives.asymmetric import padding
 
     # Split the encrypted data
@@ -290,9 +263,6 @@ def hybrid_decrypt(encrypted_data: str, rsa_private_key_b64: str) -> str:
     encrypted_aes_key_b64, aes_encrypted_b64 = parts
 
     # Decrypt AES key with RSA
-    rsa_private_der = base64.b64decode(rsa_private_key_b64)
-    rsa_private_key = serialization.load_der_private_key(rsa_private_der, password=None, backend=default_backend())
-
     encrypted_aes_key = base64.b64decode(encrypted_aes_key_b64)
     aes_key = rsa_private_key.decrypt(
         encrypted_aes_key,
@@ -309,8 +279,6 @@ def hybrid_decrypt(encrypted_data: str, rsa_private_key_b64: str) -> str:
     tag = aes_encrypted[12:28]  # Next 16 bytes are tag
     ciphertext = aes_encrypted[28:]  # Rest is ciphertext
 
-    cipher = ciphers.Cipher(algorithms.AES(aes_key), modes.GCM(iv, tag))
-    decryptor = cipher.decryptor()
-    plaintext = decryptor.update(ciphertext) + decryptor.finalize()
+    plaintext = AESGCM(aes_key).decrypt(iv, ciphertext + tag, None)
 
     return plaintext.decode('utf-8')
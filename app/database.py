@@ -16,7 +16,16 @@ if DATABASE_URL.startswith("sqlite"):
         echo=True
     )
 else:
-    engine = create_engine(DATABASE_URL, echo=True)
+    # Size the pool for concurrent requests: each in-flight request holds one connection for its Session
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+    DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+    engine = create_engine(
+        DATABASE_URL,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        echo=True
+    )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -41,6 +41,8 @@ async def lifespan(app: FastAPI):
 
     yield
 
+    await oauth.close_http_client()
+
 app = FastAPI(
     title="Sigma Permit API",
     description="API for managing tenants, templates, and licenses",
@@ -82,8 +84,7 @@ app.include_router(roles.router, prefix="/api/v1/roles", tags=["roles"])
 @app.get("/.well-known/openid-configuration")
 async def openid_configuration():
     """OpenID Connect discovery endpoint"""
-    from app.routers.oauth import openid_configuration as oauth_discovery
-    return await oauth_discovery()
+    return await oauth.openid_configuration()
 app.include_router(tenants.router, prefix="/api/tenants", tags=["tenants"])
 app.include_router(templates.router, prefix="/api/templates", tags=["templates"])
 app.include_router(licenses.router, prefix="/api/licenses", tags=["licenses"])
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON, Numeric, Enum, Table
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON, Numeric, Enum, Table, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from sqlalchemy.dialects.sqlite import TEXT
@@ -41,7 +41,7 @@ class License(Base):
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
     license_key = Column(String, unique=True, nullable=False)  # Public license key for customer
     license_secret = Column(Text, nullable=False)  # Private cryptographic key for server
-    tenant_id = Column(String(36), ForeignKey("tenants.id"), nullable=False)
+    tenant_id = Column(String(36), ForeignKey("tenants.id"), nullable=False, index=True)
     template_id = Column(String(36), ForeignKey("templates.id"), nullable=True)
     linked_subscription = Column(String(36), ForeignKey("subscriptions.id"), nullable=True)  # Optional link to subscription
     issued_at = Column(DateTime(timezone=True), nullable=True)
@@ -215,6 +215,11 @@ class Subscription(Base):
     entitlements = relationship("SubscriptionEntitlement", back_populates="subscription", cascade="all, delete-orphan")
     licenses = relationship("License", back_populates="subscription", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Tenant-scoped lists and the tenant -> plans lookups; also serves tenant_id-only filters
+        Index('idx_subscriptions_tenant_plan', 'tenant_id', 'plan_id'),
+    )
+
 class SubscriptionEntitlement(Base):
     __tablename__ = "subscription_entitlements"
 
@@ -1,7 +1,7 @@
 # RBAC Models for Sigma IAM
-from sqlalchemy import Column, String, Boolean, DateTime, Text, ForeignKey, JSON, Table, Enum, UniqueConstraint
+from sqlalchemy import Column, String, Boolean, DateTime, Text, ForeignKey, JSON, Table, Enum, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 import uuid
 from app.database import Base
 
@@ -66,7 +66,6 @@ class Permission(Base):
 
 class UserSession(Base):
     __tablename__ = "user_sessions"
-    __table_args__ = {'extend_existing': True}
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()), index=True)
     user_id = Column(String(36), ForeignKey("users.id"), nullable=False)
@@ -75,6 +74,7 @@ class UserSession(Base):
     ip_address = Column(String(45), nullable=True)  # IPv6 compatible
     user_agent = Column(Text, nullable=True)
     location = Column(JSON, nullable=True)
+    device_fingerprint = Column(String(64), nullable=True)  # create_session_fingerprint(device_info), set at insert
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     last_activity = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -83,6 +83,14 @@ class UserSession(Base):
     # Relationships
     user = relationship("User", back_populates="sessions")
 
+    __table_args__ = (
+        Index('idx_user_sessions_user_fingerprint', 'user_id', 'device_fingerprint'),
+        # Partial index for expiry sweeps over still-active sessions (plain expires_at index on MySQL)
+        Index('idx_user_sessions_active_expires', 'expires_at',
+              postgresql_where=text('is_active = true'), sqlite_where=text('is_active = 1')),
+        {'extend_existing': True},
+    )
+
 class AuditLog(Base):
     __tablename__ = "audit_log"
     __table_args__ = {'extend_existing': True}
@@ -0,0 +1,30 @@
+from typing import Annotated, List, Optional
+from fastapi import Path
+from pydantic import AfterValidator
+from app import schemas
+
+# Hyphenated UUID in either case; ids are stored lowercase in the String(36) id columns, so a matching
+# path id is lowercased and passed to the queries and cache keys as-is instead of going through uuid.UUID
+ID_PATTERN = r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$"
+IdPath = Annotated[str, Path(pattern=ID_PATTERN), AfterValidator(str.lower)]
+
+# Conventions shared by the paginated list routes:
+# - each router validates a whole page of ORM rows in one pydantic-core call through a module-level
+#   TypeAdapter(List[...]) instead of model_validate() per row;
+# - an `after` cursor selects keyset pagination: the query seeks past that id instead of scanning OFFSET
+#   rows, and one extra row fetched signals that there is a next page (crud.keyset_page);
+# - a parent's existence is only checked when its page comes back empty, since any row proves it exists.
+def page_count(total: int, size: int) -> int:
+    return (total + size - 1) // size if size > 0 else 0
+
+# List routes declare response_model=PaginatedResponse and no response_class, so FastAPI serializes
+# this straight to JSON bytes in pydantic-core; a custom class (e.g. ORJSONResponse) would bypass that
+def paginate_response(items: List, total: int, page: int, size: int, next_cursor: Optional[str] = None) -> schemas.PaginatedResponse:
+    return schemas.PaginatedResponse(
+        items=items,
+        total=total,
+        page=page,
+        size=size,
+        pages=page_count(total, size),
+        next_cursor=next_cursor
+    )
@@ -111,7 +111,7 @@ async def create_application(
     db.refresh(db_application)
 
     # Return with client secret (only shown on creation)
-    response = schemas.OAuthClient.from_orm(db_application)
+    response = schemas.OAuthClient.model_validate(db_application)
     # Add client_secret to response for initial setup
     response.__dict__['client_secret'] = client_secret
     return response
@@ -5,6 +5,7 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from sqlalchemy import or_ as sql_or
 from typing import List, Optional, Dict, Any
+from pydantic import TypeAdapter
 from app.database import get_db
 from app import crud, models, schemas
 from app.auth import create_access_token, create_refresh_token, verify_refresh_token, get_current_user, ACCESS_TOKEN_EXPIRE_MINUTES
@@ -14,6 +15,8 @@ router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+_USER_LIST = TypeAdapter(List[schemas.User])
+
 @router.post("/login", response_model=schemas.TokenResponse)
 async def login(
     request: Request,
@@ -75,6 +78,7 @@ async def login(
         device_info=device_info,
         ip_address=device_info.get("ip_address"),
         user_agent=device_info.get("user_agent"),
+        device_fingerprint=fingerprint,
         is_active=True,
         expires_at=expires_at
     )
@@ -87,7 +91,7 @@ async def login(
         access_token=access_token,
         refresh_token=refresh_token,
         token_type="bearer",
-        user=schemas.User.from_orm(user)
+        user=schemas.User.model_validate(user)
     )
 
 @router.post("/refresh", response_model=schemas.TokenResponse)
@@ -136,7 +140,7 @@ async def refresh_token(
         access_token=new_access_token,
         refresh_token=new_refresh_token,
         token_type="bearer",
-        user=schemas.User.from_orm(user)
+        user=schemas.User.model_validate(user)
     )
 
 @router.post("/logout")
@@ -152,7 +156,7 @@ async def logout(
 @router.get("/me", response_model=schemas.User)
 async def read_users_me(current_user: models.User = Depends(get_current_user)):
     """Get current user information"""
-    return schemas.User.from_orm(current_user)
+    return schemas.User.model_validate(current_user)
 
 @router.post("/change-password")
 async def change_password(
@@ -189,7 +193,7 @@ async def read_users(
         )
 
     users = crud.get_users(db, skip=skip, limit=limit)
-    return [schemas.User.from_orm(user) for user in users]
+    return _USER_LIST.validate_python(users, from_attributes=True)
 
 @router.post("/users", response_model=schemas.User)
 async def create_user(
@@ -214,7 +218,7 @@ async def create_user(
     if db_user:
         raise HTTPException(status_code=400, detail="Username already registered")
 
-    return schemas.User.from_orm(crud.create_user(db=db, user=user))
+    return schemas.User.model_validate(crud.create_user(db=db, user=user))
 
 @router.get("/users/{user_id}", response_model=schemas.User)
 async def read_user(
@@ -233,7 +237,7 @@ async def read_user(
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    return schemas.User.from_orm(db_user)
+    return schemas.User.model_validate(db_user)
 
 @router.put("/users/{user_id}", response_model=schemas.User)
 async def update_user(
@@ -258,7 +262,7 @@ async def update_user(
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    return schemas.User.from_orm(db_user)
+    return schemas.User.model_validate(db_user)
 
 @router.delete("/users/{user_id}")
 async def delete_user(
@@ -455,7 +459,7 @@ async def enhanced_login(
     db.commit()
 
     # Create enhanced user response
-    enhanced_user = schemas.User.from_orm(user)
+    enhanced_user = schemas.User.model_validate(user)
     enhanced_user.__dict__.update({
         'roles': user_roles,
         'permissions': list(set(user_permissions)),  # Remove duplicates
@@ -544,7 +548,7 @@ async def list_users_v1(
     total_pages = (total + size - 1) // size if size > 0 else 0
 
     return schemas.PaginatedResponse(
-        items=[schemas.User.from_orm(user) for user in users],
+        items=_USER_LIST.validate_python(users, from_attributes=True),
         total=total,
         page=page,
         size=size,
@@ -556,7 +560,7 @@ async def get_my_profile(
     current_user: models.User = Depends(get_current_user)
 ):
     """Get current user's profile"""
-    return schemas.User.from_orm(current_user)
+    return schemas.User.model_validate(current_user)
 
 @router.put("/v1/users/me/profile", response_model=schemas.User)
 async def update_my_profile(
@@ -574,7 +578,7 @@ async def update_my_profile(
     if not updated_user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    return schemas.User.from_orm(updated_user)
+    return schemas.User.model_validate(updated_user)
 
 @router.post("/v1/users/bulk-create", response_model=dict)
 async def bulk_create_users(
@@ -607,7 +611,7 @@ async def bulk_create_users(
                 continue
 
             user = crud.create_user(db=db, user=user_data)
-            created_users.append(schemas.User.from_orm(user))
+            created_users.append(schemas.User.model_validate(user))
         except Exception as e:
             errors.append({"index": i, "error": str(e), "data": user_data.model_dump()})
 
@@ -643,7 +647,7 @@ async def bulk_update_users(
             user = crud.update_user(db, user_id, update_schema)
 
             if user:
-                updated_users.append(schemas.User.from_orm(user))
+                updated_users.append(schemas.User.model_validate(user))
             else:
                 errors.append({"index": i, "error": "User not found", "user_id": user_id})
         except Exception as e:
@@ -727,7 +731,7 @@ async def export_users(
 
     if format == "json":
         return {
-            "users": [schemas.User.from_orm(user).model_dump() for user in users],
+            "users": _USER_LIST.dump_python(_USER_LIST.validate_python(users, from_attributes=True)),
             "total": len(users),
             "exported_at": datetime.utcnow().isoformat()
         }
@@ -766,7 +770,7 @@ async def verify_user_email(
     db.commit()
     db.refresh(user)
 
-    return schemas.User.from_orm(user)
+    return schemas.User.model_validate(user)
 
 @router.patch("/v1/users/{user_id}/activate", response_model=schemas.User)
 async def activate_user(
@@ -789,7 +793,7 @@ async def activate_user(
     db.commit()
     db.refresh(user)
 
-    return schemas.User.from_orm(user)
+    return schemas.User.model_validate(user)
 
 @router.patch("/v1/users/{user_id}/deactivate", response_model=schemas.User)
 async def deactivate_user(
@@ -818,4 +822,4 @@ async def deactivate_user(
     db.commit()
     db.refresh(user)
 
-    return schemas.User.from_orm(user)
+    return schemas.User.model_validate(user)
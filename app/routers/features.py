@@ -1,28 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from math import ceil
+from typing import Optional
 from uuid import UUID
 from app import crud, models, schemas
+from app.cache import cached_count
 from app.database import get_db
 from app.auth import get_current_user
-from fastapi.templating import Jinja2Templates
-
-templates = Jinja2Templates(directory="app/templates")
-templates.env.globals.update(min=min, max=max)
+from app.routers._common import page_count, paginate_response
+from app.templating import templates
 
 router = APIRouter()
 
-def paginate_response(items: List, total: int, page: int, size: int) -> schemas.PaginatedResponse:
-    return schemas.PaginatedResponse(
-        items=items,
-        total=total,
-        page=page,
-        size=size,
-        pages=ceil(total / size) if size > 0 else 0
-    )
-
 @router.post("", response_model=schemas.FeatureDefinition)
 def create_feature(
     feature: schemas.FeatureDefinitionCreate,
@@ -49,9 +38,9 @@ def read_features(
         # Return HTML for HTMX
         skip = (page - 1) * size
         features = crud.get_feature_definitions(db, product_id=product_id, skip=skip, limit=size)
-        total = db.query(models.FeatureDefinition).count()
-        pages = ceil(total / size) if size > 0 else 0
-        return templates.TemplateResponse("features_list.html", {
+        total = crud.compute_total(features, skip, size, lambda: cached_count(("features", product_id), lambda: crud.count_feature_definitions(db, product_id=product_id)))
+        pages = page_count(total, size)
+        return templates.TemplateResponse(request, "features_list.html", {
             "request": request,
             "features": features,
             "page": page,
@@ -63,7 +52,7 @@ def read_features(
     # Return JSON for API requests
     skip = (page - 1) * size
     features = crud.get_feature_definitions_with_product(db, product_id=product_id, skip=skip, limit=size)
-    total = db.query(models.FeatureDefinition).count()
+    total = crud.compute_total(features, skip, size, lambda: cached_count(("features", product_id), lambda: crud.count_feature_definitions(db, product_id=product_id)))
     return paginate_response(
         items=features,
         total=total,
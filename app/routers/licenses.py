@@ -1,19 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, Form, Body, UploadFile, File
-from fastapi.responses import HTMLResponse, FileResponse
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from math import ceil
+from fastapi.responses import HTMLResponse, FileResponse, Response
+from sqlalchemy.orm import Session, joinedload
+from typing import Optional
+from functools import lru_cache
 from datetime import datetime, timedelta
 import json
 import base64
 from uuid import UUID
 from app import crud, models, schemas
-from app.database import get_db
+from app.cache import cached_count
+from app.database import get_db, SessionLocal
 from app.auth import get_current_user
+from app.routers._common import page_count, paginate_response
+from app.templating import templates
 from app.crypto_utils import sign_payload, verify_signature, rsa_encrypt, rsa_decrypt, hybrid_encrypt, hybrid_decrypt, generate_rsa_keypair
-from fastapi.templating import Jinja2Templates
 
-templates = Jinja2Templates(directory="app/templates")
+# Compact encoder for the signed license section. Reused so json.dumps doesn't build a new
+# encoder per call; output must stay identical to the validators' json.dumps re-serialization.
+_LICENSE_JSON = json.JSONEncoder(separators=(',', ':'))
 
 router = APIRouter()
 
@@ -28,14 +32,14 @@ def get_master_key(db: Session) -> str:
         db.refresh(master_key)
     return master_key.aes_key
 
-def paginate_response(items: List, total: int, page: int, size: int) -> schemas.PaginatedResponse:
-    return schemas.PaginatedResponse(
-        items=items,
-        total=total,
-        page=page,
-        size=size,
-        pages=ceil(total / size) if size > 0 else 0
-    )
+@lru_cache(maxsize=1)
+def get_master_public_key() -> str:
+    """Get the master public key used to encrypt license files (cached until rotated)."""
+    with SessionLocal() as db:
+        master_key_record = db.query(models.MasterKey).first()
+        if not master_key_record:
+            raise HTTPException(status_code=500, detail="Master key not configured")
+        return master_key_record.public_key
 
 @router.post("", response_model=schemas.LicenseResponse)
 def create_license(
@@ -117,6 +121,7 @@ def rotate_master_key(db: Session = Depends(get_db), current_user: models.User =
     db.add(new_master_key)
     db.commit()
     db.refresh(new_master_key)
+    get_master_public_key.cache_clear()
 
     return {
         "message": "Master key rotated successfully",
@@ -155,6 +160,7 @@ def override_master_key(
     db.add(new_master_key)
     db.commit()
     db.refresh(new_master_key)
+    get_master_public_key.cache_clear()
 
     return {
         "message": "Master key overridden successfully",
@@ -195,90 +201,81 @@ def issue_license_file(encoded_license_key: str, db: Session = Depends(get_db)):
     except Exception as e:
         raise HTTPException(status_code=400, detail="Invalid base64 encoded license key")
 
-    # Find the license in database by license_key
-    db_license = db.query(models.License).filter(models.License.license_key == license_key).first()
+    return build_license_file(license_key, db)
+
+
+@router.get("/issue/{license_key:path}")
+def issue_license_file_by_key(license_key: str, db: Session = Depends(get_db)):
+    """
+    Issue a license file for download.
+    Input: raw license key (no base64 wrapping)
+    Output: Encrypted license file (license.lic)
+    """
+    return build_license_file(license_key, db)
+
+
+def build_license_file(license_key: str, db: Session) -> Response:
+    """Build the encrypted license.lic download for a license key."""
+    # Master public key comes from the process cache, so the license query below is the only DB round-trip
+    master_public_key = get_master_public_key()
+
+    # Find the license by license_key (unique index), loading its subscription and plan in the same query
+    db_license = db.query(models.License).options(
+        joinedload(models.License.subscription).joinedload(models.Subscription.plan)
+    ).filter(models.License.license_key == license_key).first()
     if not db_license:
         raise HTTPException(status_code=404, detail="License not found")
 
     # Calculate validity_days dynamically for licenses linked to subscriptions
     validity_days = db_license.validity_days
     expires_at = None
-    if db_license.linked_subscription:
-        subscription = crud.get_subscription(db, db_license.linked_subscription)
-        if subscription:
-            # Use same logic as create_license
-            if subscription.end_date:
-                from datetime import timedelta
-                validity_period = subscription.end_date - subscription.issue_date
-                validity_days = validity_period.days
-                expires_at = subscription.end_date.isoformat()
-            elif subscription.plan and subscription.issue_date:
-                plan = crud.get_plan_definition(db, subscription.plan_id)
-                if plan:
-                    if plan.billing_interval == 'monthly':
-                        # Use actual number of days in the month of issue_date
-                        import calendar
-                        year = subscription.issue_date.year
-                        month = subscription.issue_date.month
-                        validity_days = calendar.monthrange(year, month)[1]
-                    elif plan.billing_interval == 'yearly':
-                        # Calculate days from issue_date to same date next year
-                        from datetime import timedelta
-                        next_year_date = subscription.issue_date.replace(year=subscription.issue_date.year + 1)
-                        validity_days = (next_year_date - subscription.issue_date).days
-
-                    # Calculate expires_at
-                    from datetime import timedelta
-                    expiry_date = subscription.issue_date + timedelta(days=validity_days - 1)
-                    expires_at = expiry_date.isoformat()
-
-    # Create the license file structure
-    license_data = {
-        "license": {
-            "id": str(db_license.id),
-            "tenant_id": str(db_license.tenant_id),
-            "linked_subscription": db_license.linked_subscription,
-            "issued_at": db_license.issued_at.isoformat() if db_license.issued_at else None,
-            "validity_days": validity_days,
-            "payload": db_license.payload
-        },
-        "signature": ""
+    subscription = db_license.subscription
+    if subscription:
+        # Use same logic as create_license
+        if subscription.end_date:
+            validity_period = subscription.end_date - subscription.issue_date
+            validity_days = validity_period.days
+            expires_at = subscription.end_date.isoformat()
+        elif subscription.plan and subscription.issue_date:
+            plan = subscription.plan
+            validity_days = crud.plan_validity_days(plan.billing_interval, subscription.issue_date) or validity_days
+
+            # Calculate expires_at
+            expiry_date = subscription.issue_date + timedelta(days=validity_days - 1)
+            expires_at = expiry_date.isoformat()
+
+    # Create the signed license section
+    license_info = {
+        "id": str(db_license.id),
+        "tenant_id": str(db_license.tenant_id),
+        "linked_subscription": db_license.linked_subscription,
+        "issued_at": db_license.issued_at.isoformat() if db_license.issued_at else None,
+        "validity_days": validity_days,
+        "payload": db_license.payload
     }
 
     # Include expires_at if available
     if expires_at:
-        license_data["license"]["expires_at"] = expires_at
+        license_info["expires_at"] = expires_at
 
     # Convert to JSON string for signing
-    license_json = json.dumps(license_data["license"], separators=(',', ':'))
+    license_json = _LICENSE_JSON.encode(license_info)
 
     # Sign the license data
     signature = sign_payload(license_json, db_license.license_secret)
 
-    # Add signature to the data
-    license_data["signature"] = signature
-
-    # Get master public key and encrypt the complete data using hybrid encryption
-    master_key_record = db.query(models.MasterKey).first()
-    if not master_key_record:
-        raise HTTPException(status_code=500, detail="Master key not configured")
-    complete_json = json.dumps(license_data, separators=(',', ':'))
-    encrypted_json = hybrid_encrypt(complete_json, master_key_record.public_key)
-
-    # Create a temporary file
-    import tempfile
-    import os
+    # Wrap the already-serialized license with its signature (base64, no escaping needed).
+    # Byte-identical to json.dumps({"license": ..., "signature": ...}, separators=(',', ':')).
+    complete_json = '{"license":' + license_json + ',"signature":"' + signature + '"}'
 
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.lic', delete=False) as temp_file:
-        temp_file.write(encrypted_json)
-        temp_file_path = temp_file.name
+    # Encrypt the complete data with the master public key using hybrid encryption
+    encrypted_json = hybrid_encrypt(complete_json, master_public_key)
 
-    # Return the file for download
-    return FileResponse(
-        path=temp_file_path,
-        filename="license.lic",
+    # Return the file for download straight from memory
+    return Response(
+        content=encrypted_json,
         media_type="application/octet-stream",
-        background=None  # Don't delete immediately, let FastAPI handle it
+        headers={"Content-Disposition": 'attachment; filename="license.lic"'}
     )
 
 @router.get("/generate-validator")
@@ -356,9 +353,9 @@ def read_licenses(
         query = db.query(models.License)
         if tenant_id:
             query = query.filter(models.License.tenant_id == tenant_id)
-        total = query.count()
-        pages = ceil(total / size) if size > 0 else 0
-        return templates.TemplateResponse("licenses_list.html", {
+        total = crud.compute_total(licenses_list, skip, size, lambda: cached_count(("licenses", tenant_id), query.count))
+        pages = page_count(total, size)
+        return templates.TemplateResponse(request, "licenses_list.html", {
             "request": request,
             "licenses": licenses_list,
             "page": page,
@@ -373,7 +370,7 @@ def read_licenses(
     query = db.query(models.License)
     if tenant_id:
         query = query.filter(models.License.tenant_id == tenant_id)
-    total = query.count()
+    total = crud.compute_total(licenses_list, skip, size, lambda: cached_count(("licenses", tenant_id), query.count))
     return paginate_response(
         items=licenses_list,
         total=total,
@@ -465,25 +462,12 @@ def validate_license(license_key: str, db: Session = Depends(get_db)):
 
             # Calculate validity_days based on current subscription (same logic as create_license)
             if subscription.end_date:
-                from datetime import timedelta
                 validity_period = subscription.end_date - subscription.issue_date
                 validity_days = validity_period.days
             elif subscription.plan:
                 plan = crud.get_plan_definition(db, subscription.plan_id)
                 if plan and subscription.issue_date:
-                    if plan.billing_interval == 'monthly':
-                        # Use actual number of days in the month of issue_date
-                        import calendar
-                        year = subscription.issue_date.year
-                        month = subscription.issue_date.month
-                        validity_days = calendar.monthrange(year, month)[1]
-                    elif plan.billing_interval == 'yearly':
-                        # Calculate days from issue_date to same date next year
-                        from datetime import timedelta
-                        next_year_date = subscription.issue_date.replace(year=subscription.issue_date.year + 1)
-                        validity_days = (next_year_date - subscription.issue_date).days
-                    else:
-                        validity_days = 30
+                    validity_days = crud.plan_validity_days(plan.billing_interval, subscription.issue_date) or 30
 
             # Use subscription's end_date as expiry, or calculate from validity_days
             if subscription.end_date:
@@ -492,14 +476,14 @@ def validate_license(license_key: str, db: Session = Depends(get_db)):
                     expiry_date = expiry_date.replace(tzinfo=timezone.utc)
             else:
                 # Calculate expiry from validity_days (issued_at + validity_days - 1)
-                expiry_date = issued_at + datetime.timedelta(days=validity_days - 1)
+                expiry_date = issued_at + timedelta(days=validity_days - 1)
         else:
             # Use license's own dates
             issued_at = db_license.issued_at
             if issued_at.tzinfo is None:
                 issued_at = issued_at.replace(tzinfo=timezone.utc)
 
-            expiry_date = issued_at + datetime.timedelta(days=db_license.validity_days)
+            expiry_date = issued_at + timedelta(days=db_license.validity_days)
 
         # Check expiry if there is an expiry date
         if expiry_date and now > expiry_date:
@@ -597,7 +581,7 @@ def validate_license_file(
 
         # Step 5: Verify signature using the public key (license_key)
         if "license" in license_data and "signature" in license_data:
-            license_json = json.dumps(license_data["license"], separators=(',', ':'))
+            license_json = _LICENSE_JSON.encode(license_data["license"])
             signature_verified = verify_signature(license_json, license_data["signature"], db_license.license_key)
             signature_status = "verified" if signature_verified else "verification_failed"
         else:
@@ -623,7 +607,6 @@ def validate_license_file(
                                 issued_at = issued_at.replace(tzinfo=timezone.utc)
 
                             if subscription.end_date:
-                                from datetime import timedelta
                                 validity_period = subscription.end_date - subscription.issue_date
                                 validity_days = validity_period.days
                                 expiry_date = subscription.end_date
@@ -632,19 +615,7 @@ def validate_license_file(
                             elif subscription.plan:
                                 plan = crud.get_plan_definition(db, subscription.plan_id)
                                 if plan:
-                                    if plan.billing_interval == 'monthly':
-                                        # Use actual number of days in the month of issue_date
-                                        import calendar
-                                        year = subscription.issue_date.year
-                                        month = subscription.issue_date.month
-                                        validity_days = calendar.monthrange(year, month)[1]
-                                    elif plan.billing_interval == 'yearly':
-                                        # Calculate days from issue_date to same date next year
-                                        from datetime import timedelta
-                                        next_year_date = subscription.issue_date.replace(year=subscription.issue_date.year + 1)
-                                        validity_days = (next_year_date - subscription.issue_date).days
-                                    else:
-                                        validity_days = 30
+                                    validity_days = crud.plan_validity_days(plan.billing_interval, subscription.issue_date) or 30
 
                                     expiry_date = issued_at + timedelta(days=validity_days - 1)
 
@@ -713,103 +684,3 @@ def validate_license_file(
             "signature": "verification_failed",
             "error": f"Unexpected error: {str(e)}"
         }
-
-@router.get("/issue")
-def issue_license_file(encoded_license_key: str, db: Session = Depends(get_db)):
-    """
-    Issue a license file for download.
-    Input: base64 encoded license key
-    Output: Encrypted license file (license.lic)
-    """
-    try:
-        # Decode the base64 encoded license key
-        license_key_b64 = encoded_license_key
-        license_key = base64.b64decode(license_key_b64).decode('utf-8')
-    except Exception as e:
-        raise HTTPException(status_code=400, detail="Invalid base64 encoded license key")
-
-    # Find the license in database by license_key
-    db_license = db.query(models.License).filter(models.License.license_key == license_key).first()
-    if not db_license:
-        raise HTTPException(status_code=404, detail="License not found")
-
-    # Calculate validity_days dynamically for licenses linked to subscriptions
-    validity_days = db_license.validity_days
-    expires_at = None
-    if db_license.linked_subscription:
-        subscription = crud.get_subscription(db, db_license.linked_subscription)
-        if subscription:
-            # Use same logic as create_license
-            if subscription.end_date:
-                from datetime import timedelta
-                validity_period = subscription.end_date - subscription.issue_date
-                validity_days = validity_period.days
-                expires_at = subscription.end_date.isoformat()
-            elif subscription.plan and subscription.issue_date:
-                plan = crud.get_plan_definition(db, subscription.plan_id)
-                if plan:
-                    if plan.billing_interval == 'monthly':
-                        # Use actual number of days in the month of issue_date
-                        import calendar
-                        year = subscription.issue_date.year
-                        month = subscription.issue_date.month
-                        validity_days = calendar.monthrange(year, month)[1]
-                    elif plan.billing_interval == 'yearly':
-                        # Calculate days from issue_date to same date next year
-                        from datetime import timedelta
-                        next_year_date = subscription.issue_date.replace(year=subscription.issue_date.year + 1)
-                        validity_days = (next_year_date - subscription.issue_date).days
-
-                    # Calculate expires_at
-                    from datetime import timedelta
-                    expiry_date = subscription.issue_date + timedelta(days=validity_days - 1)
-                    expires_at = expiry_date.isoformat()
-
-    # Create the license file structure
-    license_data = {
-        "license": {
-            "id": str(db_license.id),
-            "tenant_id": str(db_license.tenant_id),
-            "linked_subscription": db_license.linked_subscription,
-            "issued_at": db_license.issued_at.isoformat() if db_license.issued_at else None,
-            "validity_days": validity_days,
-            "payload": db_license.payload
-        },
-        "signature": ""
-    }
-
-    # Include expires_at if available
-    if expires_at:
-        license_data["license"]["expires_at"] = expires_at
-
-    # Convert to JSON string for signing
-    license_json = json.dumps(license_data["license"], separators=(',', ':'))
-
-    # Sign the license data
-    signature = sign_payload(license_json, db_license.license_secret)
-
-    # Add signature to the data
-    license_data["signature"] = signature
-
-    # Get master public key and encrypt the complete data using hybrid encryption
-    master_key_record = db.query(models.MasterKey).first()
-    if not master_key_record:
-        raise HTTPException(status_code=500, detail="Master key not configured")
-    complete_json = json.dumps(license_data, separators=(',', ':'))
-    encrypted_json = hybrid_encrypt(complete_json, master_key_record.public_key)
-
-    # Create a temporary file
-    import tempfile
-    import os
-
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.lic', delete=False) as temp_file:
-        temp_file.write(encrypted_json)
-        temp_file_path = temp_file.name
-
-    # Return the file for download
-    return FileResponse(
-        path=temp_file_path,
-        filename="license.lic",
-        media_type="application/octet-stream",
-        background=None  # Don't delete immediately, let FastAPI handle it
-    )
@@ -1,12 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Form
 from fastapi.responses import RedirectResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from typing import Optional
+import asyncio
 import secrets
 import hashlib
+import hmac
 import base64
 import os
-import requests
+import re
+import httpx
+from types import MappingProxyType
+from urllib.parse import urlencode, quote
 from datetime import datetime, timedelta
 from app.database import get_db
 from app import models, schemas, crud
@@ -14,6 +20,23 @@ from app.auth import create_access_token, create_refresh_token, verify_token
 
 router = APIRouter()
 
+# Shared async HTTP client for social provider calls (pooled, keeps TLS connections alive)
+_ASYNC_HTTP = httpx.AsyncClient(
+    timeout=httpx.Timeout(5.0, connect=2.0),
+    transport=httpx.AsyncHTTPTransport(
+        retries=2,  # connection failures only
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+    )
+)
+
+async def close_http_client():
+    """Close the shared social provider HTTP client (called on app shutdown)"""
+    await _ASYNC_HTTP.aclose()
+
+# Public URLs, read once at import
+BASE_URL = os.getenv("BASE_URL", "http://localhost:8000")
+FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
+
 # Social Provider Configurations
 SOCIAL_PROVIDERS = {
     "google": {
@@ -23,7 +46,7 @@ SOCIAL_PROVIDERS = {
         "token_url": "https://oauth2.googleapis.com/token",
         "userinfo_url": "https://www.googleapis.com/oauth2/v2/userinfo",
         "scope": "openid email profile",
-        "redirect_uri": os.getenv("BASE_URL", "http://localhost:8000") + "/oauth/v1/social/google/callback"
+        "redirect_uri": BASE_URL + "/oauth/v1/social/google/callback"
     },
     "github": {
         "client_id": os.getenv("GITHUB_CLIENT_ID"),
@@ -32,7 +55,7 @@ SOCIAL_PROVIDERS = {
         "token_url": "https://github.com/login/oauth/access_token",
         "userinfo_url": "https://api.github.com/user",
         "scope": "user:email",
-        "redirect_uri": os.getenv("BASE_URL", "http://localhost:8000") + "/oauth/v1/social/github/callback"
+        "redirect_uri": BASE_URL + "/oauth/v1/social/github/callback"
     },
     "microsoft": {
         "client_id": os.getenv("MICROSOFT_CLIENT_ID"),
@@ -41,7 +64,7 @@ SOCIAL_PROVIDERS = {
         "token_url": "https://login.microsoftonline.com/common/oauth2/v2.0/token",
         "userinfo_url": "https://graph.microsoft.com/v1.0/me",
         "scope": "openid email profile",
-        "redirect_uri": os.getenv("BASE_URL", "http://localhost:8000") + "/oauth/v1/social/microsoft/callback"
+        "redirect_uri": BASE_URL + "/oauth/v1/social/microsoft/callback"
     },
     "facebook": {
         "client_id": os.getenv("FACEBOOK_CLIENT_ID"),
@@ -50,10 +73,17 @@ SOCIAL_PROVIDERS = {
         "token_url": "https://graph.facebook.com/v18.0/oauth/access_token",
         "userinfo_url": "https://graph.facebook.com/me?fields=id,name,email",
         "scope": "email,public_profile",
-        "redirect_uri": os.getenv("BASE_URL", "http://localhost:8000") + "/oauth/v1/social/facebook/callback"
+        "redirect_uri": BASE_URL + "/oauth/v1/social/facebook/callback"
     }
 }
 
+# Providers with credentials set, resolved once at import (environment is read above)
+_CONFIGURED_PROVIDERS = MappingProxyType({
+    name: MappingProxyType(config)
+    for name, config in SOCIAL_PROVIDERS.items()
+    if config["client_id"] and config["client_secret"]
+})
+
 # Helper functions
 def generate_client_id() -> str:
     """Generate a unique client ID"""
@@ -63,33 +93,44 @@ def generate_client_secret() -> str:
     """Generate a client secret"""
     return secrets.token_urlsafe(64)
 
+# An S256 challenge is exactly the 43-character unpadded base64url form of a SHA-256 digest;
+# the last character carries 2 unused bits, which must be zero for the encoding to be canonical
+_S256_CHALLENGE_RE = re.compile(r"[A-Za-z0-9_-]{42}[AEIMQUYcgkosw048]")
+
 def verify_pkce(code_challenge: str, code_verifier: str, method: str = "S256") -> bool:
     """Verify PKCE code challenge"""
     if method == "S256":
-        code_challenge_computed = base64.urlsafe_b64encode(
-            hashlib.sha256(code_verifier.encode('ascii')).digest()
-        ).decode('ascii').rstrip('=')
-        return secrets.compare_digest(code_challenge, code_challenge_computed)
+        # Compare raw SHA-256 digests rather than re-encoding the computed digest.
+        # urlsafe_b64decode silently drops stray characters, so decode strictly and reject anything non-canonical.
+        if not _S256_CHALLENGE_RE.fullmatch(code_challenge):
+            return False
+        try:
+            challenge_digest = base64.b64decode(code_challenge + "=", altchars=b'-_', validate=True)
+        except ValueError:
+            return False
+        if len(challenge_digest) != 32:
+            return False
+        return hmac.compare_digest(hashlib.sha256(code_verifier.encode('ascii')).digest(), challenge_digest)
     elif method == "plain":
-        return secrets.compare_digest(code_challenge, code_verifier)
+        return hmac.compare_digest(code_challenge.encode('ascii'), code_verifier.encode('ascii'))
     return False
 
-def get_social_provider_config(provider: str) -> dict:
+def get_social_provider_config(provider: str) -> MappingProxyType:
     """Get social provider configuration"""
-    config = SOCIAL_PROVIDERS.get(provider.lower())
-    if not config:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Unsupported social provider: {provider}"
-        )
-    if not config.get("client_id") or not config.get("client_secret"):
+    config = _CONFIGURED_PROVIDERS.get(provider.lower())
+    if config is None:
+        if provider.lower() not in SOCIAL_PROVIDERS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unsupported social provider: {provider}"
+            )
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Social provider {provider} not configured"
         )
     return config
 
-def exchange_code_for_token(provider_config: dict, code: str) -> dict:
+async def exchange_code_for_token(provider_config: MappingProxyType, code: str) -> dict:
     """Exchange authorization code for access token"""
     data = {
         "client_id": provider_config["client_id"],
@@ -103,11 +144,11 @@ def exchange_code_for_token(provider_config: dict, code: str) -> dict:
     if "github" in provider_config["token_url"]:
         headers["Accept"] = "application/json"
 
-    response = requests.post(provider_config["token_url"], data=data, headers=headers)
+    response = await _ASYNC_HTTP.post(provider_config["token_url"], data=data, headers=headers)
     response.raise_for_status()
     return response.json()
 
-def get_user_info(provider: str, access_token: str) -> dict:
+async def get_user_info(provider: str, access_token: str) -> dict:
     """Get user information from social provider"""
     config = get_social_provider_config(provider)
     headers = {"Authorization": f"Bearer {access_token}"}
@@ -116,7 +157,15 @@ def get_user_info(provider: str, access_token: str) -> dict:
         # GitHub requires token in header
         headers = {"Authorization": f"token {access_token}"}
 
-    response = requests.get(config["userinfo_url"], headers=headers)
+    if provider.lower() == "github":
+        # GitHub usually hides the primary email on /user, so fetch /user/emails concurrently
+        response, email_response = await asyncio.gather(
+            _ASYNC_HTTP.get(config["userinfo_url"], headers=headers),
+            _ASYNC_HTTP.get("https://api.github.com/user/emails", headers=headers)
+        )
+    else:
+        response = await _ASYNC_HTTP.get(config["userinfo_url"], headers=headers)
+        email_response = None
     response.raise_for_status()
     user_data = response.json()
 
@@ -132,8 +181,7 @@ def get_user_info(provider: str, access_token: str) -> dict:
     }
 
     # For GitHub, get email separately if not provided
-    if provider.lower() == "github" and not normalized_data["email"]:
-        email_response = requests.get("https://api.github.com/user/emails", headers=headers)
+    if email_response is not None and not normalized_data["email"]:
         if email_response.status_code == 200:
             emails = email_response.json()
             primary_email = next((email for email in emails if email.get("primary")), None)
@@ -176,7 +224,7 @@ async def social_login_initiate(
         params["access_type"] = "offline"
         params["prompt"] = "consent"
 
-    auth_url = config["authorize_url"] + "?" + "&".join([f"{k}={requests.utils.quote(str(v))}" for k, v in params.items()])
+    auth_url = f"{config['authorize_url']}?{urlencode(params, quote_via=quote)}"
 
     return RedirectResponse(url=auth_url)
 
@@ -201,10 +249,10 @@ async def social_login_callback(
         config = get_social_provider_config(provider)
 
         # Exchange code for token
-        token_data = exchange_code_for_token(config, code)
+        token_data = await exchange_code_for_token(config, code)
 
         # Get user info
-        user_info = get_user_info(provider, token_data["access_token"])
+        user_info = await get_user_info(provider, token_data["access_token"])
 
         # Check if social connection exists
         social_connection = db.query(models.SocialConnection).filter(
@@ -254,12 +302,11 @@ async def social_login_callback(
                     is_active=True,
                     email_verified=bool(user_info["email"])
                 )
-                db.add(user)
-                db.flush()  # Get user ID
 
-                # Create social connection
+                # Create social connection, linked through the relationship so both rows
+                # are inserted in one flush at commit (user first, by dependency order)
                 social_connection = models.SocialConnection(
-                    user_id=user.id,
+                    user=user,
                     provider=user_info["provider"],
                     provider_user_id=user_info["provider_user_id"],
                     provider_username=user_info["username"],
@@ -272,7 +319,7 @@ async def social_login_callback(
                     profile_data=user_info["profile_data"],
                     is_primary=True
                 )
-                db.add(social_connection)
+                db.add_all([user, social_connection])
 
         db.commit()
 
@@ -281,8 +328,7 @@ async def social_login_callback(
         refresh_token = create_refresh_token(data={"sub": str(user.id), "tenant_id": user.tenant_id, "type": "refresh"})
 
         # Redirect to frontend with tokens
-        frontend_url = os.getenv("FRONTEND_URL", "http://localhost:3000")
-        redirect_url = f"{frontend_url}/auth/callback?access_token={access_token}&refresh_token={refresh_token}&state={state}"
+        redirect_url = f"{FRONTEND_URL}/auth/callback?access_token={access_token}&refresh_token={refresh_token}&state={state}"
 
         return RedirectResponse(url=redirect_url)
 
@@ -350,10 +396,8 @@ async def token(
                 detail="Authorization code required"
             )
 
-        # Find authorization code
-        auth_code = db.query(models.OAuthAuthorizationCode).filter(
-            models.OAuthAuthorizationCode.code == code
-        ).first()
+        # Find authorization code (primary key lookup, served from the identity map when loaded)
+        auth_code = db.get(models.OAuthAuthorizationCode, code)
 
         if not auth_code or auth_code.expires_at < datetime.utcnow():
             raise HTTPException(
@@ -410,9 +454,9 @@ async def token(
             )
 
         # Find refresh token
-        refresh_token_obj = db.query(models.OAuthRefreshToken).filter(
-            models.OAuthRefreshToken.token == refresh_token
-        ).first()
+        refresh_token_obj = db.execute(
+            select(models.OAuthRefreshToken).where(models.OAuthRefreshToken.token == refresh_token)
+        ).scalar_one_or_none()
 
         if not refresh_token_obj or refresh_token_obj.expires_at < datetime.utcnow():
             raise HTTPException(
@@ -519,28 +563,31 @@ async def revoke(
 
     return {"message": "Token revoked"}
 
-@router.get("/.well-known/openid-configuration")
+# Discovery document only depends on BASE_URL, so build it once
+_OIDC_DISCOVERY = schemas.OIDCDiscoveryDocument(
+    issuer=f"{BASE_URL}",
+    authorization_endpoint=f"{BASE_URL}/oauth/v1/authorize",
+    token_endpoint=f"{BASE_URL}/oauth/v1/token",
+    userinfo_endpoint=f"{BASE_URL}/oauth/v1/userinfo",
+    jwks_uri=f"{BASE_URL}/oauth/v1/jwks",
+    response_types_supported=["code", "token", "id_token"],
+    subject_types_supported=["public"],
+    id_token_signing_alg_values_supported=["RS256"],
+    scopes_supported=["openid", "profile", "email", "read", "write"],
+    token_endpoint_auth_methods_supported=["client_secret_basic", "client_secret_post"],
+    claims_supported=["sub", "name", "email", "email_verified", "preferred_username"]
+)
+
+@router.get("/.well-known/openid-configuration", response_model=schemas.OIDCDiscoveryDocument)
 async def openid_configuration():
     """OpenID Connect discovery endpoint"""
-    base_url = "http://localhost:8000"  # In real implementation, get from config
-
-    return schemas.OIDCDiscoveryDocument(
-        issuer=f"{base_url}",
-        authorization_endpoint=f"{base_url}/oauth/v1/authorize",
-        token_endpoint=f"{base_url}/oauth/v1/token",
-        userinfo_endpoint=f"{base_url}/oauth/v1/userinfo",
-        jwks_uri=f"{base_url}/oauth/v1/jwks",
-        response_types_supported=["code", "token", "id_token"],
-        subject_types_supported=["public"],
-        id_token_signing_alg_values_supported=["RS256"],
-        scopes_supported=["openid", "profile", "email", "read", "write"],
-        token_endpoint_auth_methods_supported=["client_secret_basic", "client_secret_post"],
-        claims_supported=["sub", "name", "email", "email_verified", "preferred_username"]
-    )
+    return _OIDC_DISCOVERY
+
+# In real implementation, return actual JWKS
+# For now, return empty set
+_JWKS = schemas.JWKSet(keys=[])
 
-@router.get("/jwks")
+@router.get("/jwks", response_model=schemas.JWKSet)
 async def jwks():
     """JSON Web Key Set endpoint"""
-    # In real implementation, return actual JWKS
-    # For now, return empty set
-    return schemas.JWKSet(keys=[])
\ No newline at end of file
+    return _JWKS
\ No newline at end of file
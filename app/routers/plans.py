@@ -1,28 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from math import ceil
+from typing import Optional
 from uuid import UUID
 from app import crud, models, schemas
+from app.cache import cached_count
 from app.database import get_db
 from app.auth import get_current_user
-from fastapi.templating import Jinja2Templates
-
-templates = Jinja2Templates(directory="app/templates")
-templates.env.globals.update(min=min, max=max)
+from app.routers._common import page_count, paginate_response
+from app.templating import templates
 
 router = APIRouter()
 
-def paginate_response(items: List, total: int, page: int, size: int) -> schemas.PaginatedResponse:
-    return schemas.PaginatedResponse(
-        items=items,
-        total=total,
-        page=page,
-        size=size,
-        pages=ceil(total / size) if size > 0 else 0
-    )
-
 @router.post("", response_model=schemas.PlanDefinition)
 def create_plan(
     plan: schemas.PlanDefinitionCreate,
@@ -49,9 +38,9 @@ def read_plans(
         # Return HTML for HTMX
         skip = (page - 1) * size
         plans = crud.get_plan_definitions(db, product_id=product_id, skip=skip, limit=size)
-        total = db.query(models.PlanDefinition).count()
-        pages = ceil(total / size) if size > 0 else 0
-        return templates.TemplateResponse("plans_list.html", {
+        total = crud.compute_total(plans, skip, size, lambda: cached_count(("plans", product_id), lambda: crud.count_plan_definitions(db, product_id=product_id)))
+        pages = page_count(total, size)
+        return templates.TemplateResponse(request, "plans_list.html", {
             "request": request,
             "plans": plans,
             "page": page,
@@ -63,7 +52,7 @@ def read_plans(
     # Return JSON for API requests
     skip = (page - 1) * size
     plans = crud.get_plan_definitions_with_product(db, product_id=product_id, skip=skip, limit=size)
-    total = db.query(models.PlanDefinition).count()
+    total = crud.compute_total(plans, skip, size, lambda: cached_count(("plans", product_id), lambda: crud.count_plan_definitions(db, product_id=product_id)))
     return paginate_response(
         items=plans,
         total=total,
@@ -1,52 +1,58 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
-from typing import List
-from math import ceil
+from typing import List, Optional
 from uuid import UUID
 from app import crud, models, schemas
 from app.database import get_db
 from app.auth import get_current_user
-from fastapi.templating import Jinja2Templates
-
-templates = Jinja2Templates(directory="app/templates")
-templates.env.globals.update(min=min, max=max)
+from app.routers._common import page_count, paginate_response
+from app.templating import templates
+from pydantic import TypeAdapter
+from starlette.concurrency import run_in_threadpool
 
 router = APIRouter()
 
-def paginate_response(items: List, total: int, page: int, size: int) -> schemas.PaginatedResponse:
-    return schemas.PaginatedResponse(
-        items=items,
-        total=total,
-        page=page,
-        size=size,
-        pages=ceil(total / size) if size > 0 else 0
-    )
+_PRODUCT_LIST = TypeAdapter(List[schemas.Product])
+
+def _products_page(db: Session, skip: int, limit: int):
+    """Fetch one OFFSET page of products and the total (sync; run in the threadpool)."""
+    return crud.get_products(db, skip=skip, limit=limit), crud.get_product_count(db)
+
+def _products_after(db: Session, after: str, limit: int):
+    """Fetch one keyset page of products, the total and the next cursor (sync; run in the threadpool)."""
+    products, next_cursor = crud.get_products_after(db, after=after, limit=limit)
+    return products, crud.get_product_count(db), next_cursor
 
 @router.post("", response_model=schemas.Product)
-def create_product(
+async def create_product(
     product: schemas.ProductCreate,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    return crud.create_product(db=db, product=product)
+    return await run_in_threadpool(crud.create_product, db=db, product=product)
 
 @router.get("", response_model=schemas.PaginatedResponse)
-def read_products(
+async def read_products(
     request: Request,
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=200),
+    after: Optional[str] = Query(None, description="Keyset pagination: return products after this id (empty for the first page)"),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    next_cursor = None
+    if after is not None:
+        products, total, next_cursor = await run_in_threadpool(_products_after, db, after, size)
+    else:
+        skip = (page - 1) * size
+        products, total = await run_in_threadpool(_products_page, db, skip, size)
+
     # Check if this is an HTMX request
     if request.headers.get("HX-Request"):
         # Return HTML for HTMX
-        skip = (page - 1) * size
-        products = crud.get_products(db, skip=skip, limit=size)
-        total = db.query(models.Product).count()
-        pages = ceil(total / size) if size > 0 else 0
-        return templates.TemplateResponse("products_list.html", {
+        pages = page_count(total, size)
+        return templates.TemplateResponse(request, "products_list.html", {
             "request": request,
             "products": products,
             "page": page,
@@ -56,46 +62,44 @@ def read_products(
         })
 
     # Return JSON for API requests
-    skip = (page - 1) * size
-    products = crud.get_products(db, skip=skip, limit=size)
-    total = db.query(models.Product).count()
     return paginate_response(
-        items=[schemas.Product.model_validate(product) for product in products],
+        items=_PRODUCT_LIST.validate_python(products, from_attributes=True),
         total=total,
         page=page,
-        size=size
+        size=size,
+        next_cursor=next_cursor
     )
 
 @router.get("/{product_id}", response_model=schemas.Product)
-def read_product(
+async def read_product(
     product_id: UUID,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    db_product = crud.get_product(db, product_id=product_id)
+    db_product = await run_in_threadpool(crud.get_product, db, product_id=product_id)
     if db_product is None:
         raise HTTPException(status_code=404, detail="Product not found")
     return db_product
 
 @router.put("/{product_id}", response_model=schemas.Product)
-def update_product(
+async def update_product(
     product_id: UUID,
     product: schemas.ProductUpdate,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    db_product = crud.update_product(db, product_id=product_id, product_update=product)
+    db_product = await run_in_threadpool(crud.update_product, db, product_id=product_id, product_update=product)
     if db_product is None:
         raise HTTPException(status_code=404, detail="Product not found")
     return db_product
 
 @router.delete("/{product_id}")
-def delete_product(
+async def delete_product(
     product_id: UUID,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    success = crud.delete_product(db, product_id=product_id)
+    success = await run_in_threadpool(crud.delete_product, db, product_id=product_id)
     if not success:
         raise HTTPException(status_code=404, detail="Product not found")
-    return {"message": "Product deleted successfully"}
\ No newline at end of file
+    return {"message": "Product deleted successfully"}
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 from app.database import get_db
-from app import models, schemas
+from app import models, schemas, crud
+from app.models.rbac import role_permissions, user_roles
 from app.auth import get_current_active_superuser, check_permission
 
 router = APIRouter()
@@ -17,7 +18,7 @@ async def get_roles(
     current_user: models.User = Depends(get_current_active_superuser)
 ):
     """Get all roles with optional tenant filtering"""
-    query = db.query(models.Role)
+    query = crud.strict_query(db, models.Role).options(selectinload(models.Role.permissions))
     if tenant_id:
         query = query.filter(models.Role.tenant_id == tenant_id)
     roles = query.offset(skip).limit(limit).all()
@@ -31,7 +32,7 @@ async def create_role(
 ):
     """Create a new role"""
     # Check if role name already exists for this tenant
-    existing_role = db.query(models.Role).filter(
+    existing_role = crud.strict_query(db, models.Role).filter(
         models.Role.name == role.name,
         models.Role.tenant_id == role.tenant_id
     ).first()
@@ -59,7 +60,7 @@ async def get_role(
     current_user: models.User = Depends(get_current_active_superuser)
 ):
     """Get a specific role by ID"""
-    role = db.query(models.Role).filter(models.Role.id == role_id).first()
+    role = crud.strict_query(db, models.Role).options(selectinload(models.Role.permissions)).filter(models.Role.id == role_id).first()
     if not role:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -75,7 +76,7 @@ async def update_role(
     current_user: models.User = Depends(get_current_active_superuser)
 ):
     """Update a role"""
-    role = db.query(models.Role).filter(models.Role.id == role_id).first()
+    role = crud.strict_query(db, models.Role).options(selectinload(models.Role.permissions)).filter(models.Role.id == role_id).first()
     if not role:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -91,7 +92,7 @@ async def update_role(
 
     # Check name uniqueness if name is being updated
     if role_update.name and role_update.name != role.name:
-        existing_role = db.query(models.Role).filter(
+        existing_role = crud.strict_query(db, models.Role).filter(
             models.Role.name == role_update.name,
             models.Role.tenant_id == role.tenant_id
         ).first()
@@ -115,7 +116,7 @@ async def delete_role(
     current_user: models.User = Depends(get_current_active_superuser)
 ):
     """Delete a role"""
-    role = db.query(models.Role).filter(models.Role.id == role_id).first()
+    role = crud.strict_query(db, models.Role).filter(models.Role.id == role_id).first()
     if not role:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -143,7 +144,7 @@ async def get_permissions(
     current_user: models.User = Depends(check_permission("roles.read"))
 ):
     """Get all permissions with optional resource filtering"""
-    query = db.query(models.Permission)
+    query = crud.strict_query(db, models.Permission)
     if resource:
         query = query.filter(models.Permission.resource == resource)
     permissions = query.offset(skip).limit(limit).all()
@@ -157,7 +158,7 @@ async def create_permission(
 ):
     """Create a new permission"""
     # Check if permission already exists
-    existing_permission = db.query(models.Permission).filter(
+    existing_permission = crud.strict_query(db, models.Permission).filter(
         models.Permission.resource == permission.resource,
         models.Permission.action == permission.action
     ).first()
@@ -188,8 +189,8 @@ async def assign_permission_to_role(
     current_user: models.User = Depends(get_current_active_superuser)
 ):
     """Assign a permission to a role"""
-    role = db.query(models.Role).filter(models.Role.id == role_id).first()
-    permission = db.query(models.Permission).filter(models.Permission.id == permission_id).first()
+    role = crud.strict_query(db, models.Role).filter(models.Role.id == role_id).first()
+    permission = crud.strict_query(db, models.Permission).filter(models.Permission.id == permission_id).first()
 
     if not role:
         raise HTTPException(
@@ -202,14 +203,14 @@ async def assign_permission_to_role(
             detail="Permission not found"
         )
 
-    # Check if already assigned
-    if permission in role.permissions:
+    # Check if already assigned (association row lookup, no collection load)
+    if db.query(role_permissions).filter_by(role_id=role.id, permission_id=permission.id).first() is not None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Permission already assigned to role"
         )
 
-    role.permissions.append(permission)
+    db.execute(role_permissions.insert().values(role_id=role.id, permission_id=permission.id))
     db.commit()
     return {"message": "Permission assigned to role successfully"}
 
@@ -221,8 +222,8 @@ async def remove_permission_from_role(
     current_user: models.User = Depends(get_current_active_superuser)
 ):
     """Remove a permission from a role"""
-    role = db.query(models.Role).filter(models.Role.id == role_id).first()
-    permission = db.query(models.Permission).filter(models.Permission.id == permission_id).first()
+    role = crud.strict_query(db, models.Role).filter(models.Role.id == role_id).first()
+    permission = crud.strict_query(db, models.Permission).filter(models.Permission.id == permission_id).first()
 
     if not role:
         raise HTTPException(
@@ -235,13 +236,17 @@ async def remove_permission_from_role(
             detail="Permission not found"
         )
 
-    if permission not in role.permissions:
+    # Delete the association row directly; no matching row means it was never assigned
+    result = db.execute(role_permissions.delete().where(
+        role_permissions.c.role_id == role.id,
+        role_permissions.c.permission_id == permission.id
+    ))
+    if result.rowcount == 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Permission not assigned to role"
         )
 
-    role.permissions.remove(permission)
     db.commit()
     return {"message": "Permission removed from role successfully"}
 
@@ -254,8 +259,8 @@ async def assign_role_to_user(
     current_user: models.User = Depends(get_current_active_superuser)
 ):
     """Assign a role to a user"""
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    role = db.query(models.Role).filter(models.Role.id == role_id).first()
+    user = crud.strict_query(db, models.User).filter(models.User.id == user_id).first()
+    role = crud.strict_query(db, models.Role).filter(models.Role.id == role_id).first()
 
     if not user:
         raise HTTPException(
@@ -268,14 +273,14 @@ async def assign_role_to_user(
             detail="Role not found"
         )
 
-    # Check if already assigned
-    if role in user.roles:
+    # Check if already assigned (association row lookup, no collection load)
+    if db.query(user_roles).filter_by(user_id=user.id, role_id=role.id).first() is not None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Role already assigned to user"
         )
 
-    user.roles.append(role)
+    db.execute(user_roles.insert().values(user_id=user.id, role_id=role.id))
     db.commit()
     return {"message": "Role assigned to user successfully"}
 
@@ -287,8 +292,8 @@ async def remove_role_from_user(
     current_user: models.User = Depends(get_current_active_superuser)
 ):
     """Remove a role from a user"""
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    role = db.query(models.Role).filter(models.Role.id == role_id).first()
+    user = crud.strict_query(db, models.User).filter(models.User.id == user_id).first()
+    role = crud.strict_query(db, models.Role).filter(models.Role.id == role_id).first()
 
     if not user:
         raise HTTPException(
@@ -301,13 +306,17 @@ async def remove_role_from_user(
             detail="Role not found"
         )
 
-    if role not in user.roles:
+    # Delete the association row directly; no matching row means it was never assigned
+    result = db.execute(user_roles.delete().where(
+        user_roles.c.user_id == user.id,
+        user_roles.c.role_id == role.id
+    ))
+    if result.rowcount == 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Role not assigned to user"
         )
 
-    user.roles.remove(role)
     db.commit()
     return {"message": "Role removed from user successfully"}
 
@@ -318,17 +327,18 @@ async def get_user_permissions(
     current_user: models.User = Depends(get_current_active_superuser)
 ):
     """Get effective permissions for a user"""
-    user = db.query(models.User).filter(models.User.id == user_id).first()
-    if not user:
+    user_exists = db.query(models.User.id).filter(models.User.id == user_id).first()
+    if not user_exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
 
-    # Collect all permissions from user's roles
-    permissions = set()
-    for role in user.roles:
-        for permission in role.permissions:
-            permissions.add(permission.name)
+    # Collect permission names across all of the user's roles in one query
+    rows = db.query(models.Permission.name).join(
+        role_permissions, role_permissions.c.permission_id == models.Permission.id
+    ).join(
+        user_roles, user_roles.c.role_id == role_permissions.c.role_id
+    ).filter(user_roles.c.user_id == user_id).distinct().all()
 
-    return {"permissions": list(permissions)}
\ No newline at end of file
+    return {"permissions": [name for (name,) in rows]}
\ No newline at end of file
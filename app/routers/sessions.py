@@ -1,88 +1,129 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from sqlalchemy import select, insert, literal, func, case, and_
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from uuid import uuid4
 import hashlib
-import json
+import time
+from functools import lru_cache
 from app.database import get_db
 from app import models, schemas, crud
 from app.auth import get_current_user
 import secrets
+import ua_parser
 
 router = APIRouter()
 
 def generate_session_id() -> str:
-    """Generate a unique session ID"""
-    return secrets.token_urlsafe(32)
+    """Generate a unique session ID (256 random bits; uniqueness is enforced by user_sessions.session_id)"""
+    return secrets.token_hex(32)
+
+# Ordered (value, keywords) table: the first entry with a keyword in the lowercased user agent wins.
+# ua-parser reports device families (e.g. "iPhone"), not form factors, so the type stays keyword based.
+_DEVICE_TYPE_KEYWORDS = (
+    ("mobile", ("mobile", "android", "iphone")),
+    ("tablet", ("tablet", "ipad")),
+)
+
+# ua-parser family names mapped onto the values stored in device_info; other families are lowercased
+_OS_FAMILIES = {
+    "Windows": "windows",
+    "Mac OS X": "macos",
+    "iOS": "ios",
+    "Android": "android",
+    "Linux": "linux",
+    "Ubuntu": "linux",
+    "Debian": "linux",
+    "Fedora": "linux",
+}
+_BROWSER_FAMILIES = {
+    "Chrome": "chrome",
+    "Chrome Mobile": "chrome",
+    "Chrome Mobile iOS": "chrome",
+    "Chrome Mobile WebView": "chrome",
+    "Firefox": "firefox",
+    "Firefox Mobile": "firefox",
+    "Firefox iOS": "firefox",
+    "Safari": "safari",
+    "Mobile Safari": "safari",
+    "Mobile Safari UI/WKWebView": "safari",
+    "Edge": "edge",
+    "Edge Mobile": "edge",
+}
+
+def _match_keywords(ua: str, table, default: str) -> str:
+    for value, keywords in table:
+        if any(keyword in ua for keyword in keywords):
+            return value
+    return default
+
+def _family(result, families: Dict[str, str]) -> str:
+    if result is None or result.family == "Other":
+        return "unknown"
+    return families.get(result.family, result.family.lower())
+
+@lru_cache(maxsize=4096)
+def parse_user_agent(user_agent: str) -> tuple:
+    """Return (device_type, os, browser) for a user agent; cached since clients repeat a small set of UAs"""
+    return (
+        _match_keywords(user_agent.lower(), _DEVICE_TYPE_KEYWORDS, "desktop"),
+        _family(ua_parser.parse_os(user_agent), _OS_FAMILIES),
+        _family(ua_parser.parse_user_agent(user_agent), _BROWSER_FAMILIES)
+    )
 
 def extract_device_info(request: Request) -> Dict[str, Any]:
     """Extract device information from request"""
     user_agent = request.headers.get("user-agent", "")
     ip_address = request.client.host if request.client else "unknown"
 
-    # Simple device detection (in production, use a proper library)
-    device_info = {
+    device_type, os_name, browser = parse_user_agent(user_agent)
+
+    return {
         "user_agent": user_agent,
         "ip_address": ip_address,
-        "device_type": "desktop",  # Default
-        "os": "unknown",
-        "browser": "unknown"
+        "device_type": device_type,
+        "os": os_name,
+        "browser": browser
     }
 
-    # Basic device type detection
-    if "mobile" in user_agent.lower() or "android" in user_agent.lower() or "iphone" in user_agent.lower():
-        device_info["device_type"] = "mobile"
-    elif "tablet" in user_agent.lower() or "ipad" in user_agent.lower():
-        device_info["device_type"] = "tablet"
-
-    # Basic OS detection
-    if "windows" in user_agent.lower():
-        device_info["os"] = "windows"
-    elif "macintosh" in user_agent.lower() or "mac os" in user_agent.lower():
-        device_info["os"] = "macos"
-    elif "linux" in user_agent.lower():
-        device_info["os"] = "linux"
-    elif "android" in user_agent.lower():
-        device_info["os"] = "android"
-    elif "ios" in user_agent.lower() or "iphone" in user_agent.lower():
-        device_info["os"] = "ios"
-
-    # Basic browser detection
-    if "chrome" in user_agent.lower():
-        device_info["browser"] = "chrome"
-    elif "firefox" in user_agent.lower():
-        device_info["browser"] = "firefox"
-    elif "safari" in user_agent.lower():
-        device_info["browser"] = "safari"
-    elif "edge" in user_agent.lower():
-        device_info["browser"] = "edge"
-
-    return device_info
-
 def create_session_fingerprint(device_info: Dict[str, Any]) -> str:
     """Create a fingerprint for device recognition"""
-    fingerprint_data = {
-        "user_agent": device_info.get("user_agent", ""),
-        "ip_address": device_info.get("ip_address", ""),
-        "device_type": device_info.get("device_type", ""),
-        "os": device_info.get("os", ""),
-        "browser": device_info.get("browser", "")
-    }
+    return _fingerprint(
+        device_info.get("user_agent") or "",
+        device_info.get("ip_address") or "",
+        device_info.get("device_type") or "",
+        device_info.get("os") or "",
+        device_info.get("browser") or ""
+    )
 
-    # Create a hash of the device info for fingerprinting
-    fingerprint_string = json.dumps(fingerprint_data, sort_keys=True)
+@lru_cache(maxsize=256)
+def _fingerprint(user_agent: str, ip_address: str, device_type: str, os_name: str, browser: str) -> str:
+    # NUL never appears in header values, so joining on it keeps the fields unambiguous
+    fingerprint_string = "\0".join((user_agent, ip_address, device_type, os_name, browser))
     return hashlib.sha256(fingerprint_string.encode()).hexdigest()
 
-def check_concurrent_session_limit(user_id: str, db: Session, max_sessions: int = 5) -> bool:
-    """Check if user has exceeded concurrent session limit"""
-    active_sessions = db.query(models.UserSession).filter(
-        models.UserSession.user_id == user_id,
-        models.UserSession.is_active == True,
-        models.UserSession.expires_at > datetime.utcnow()
-    ).count()
-
-    return active_sessions < max_sessions
+def insert_session_within_limit(db: Session, values: Dict[str, Any], now: datetime, max_sessions: int = 5) -> bool:
+    """Insert a session row only if the user is under the concurrent session limit.
+
+    The limit check and the insert are one INSERT ... SELECT ... WHERE statement. That narrows the race
+    between counting and inserting but does not close it: under READ COMMITTED two concurrent logins can
+    both see the old count and both insert (a strict limit would need SERIALIZABLE or a user row lock).
+    Returns False when the limit was reached.
+    """
+    table = models.UserSession.__table__
+    active_sessions = select(func.count()).select_from(table).where(
+        table.c.user_id == values["user_id"],
+        table.c.is_active == True,
+        table.c.expires_at > now
+    ).scalar_subquery()
+
+    columns = list(values)
+    row = select(*[literal(values[name], table.c[name].type) for name in columns]).where(
+        active_sessions < max_sessions
+    )
+    result = db.execute(insert(table).from_select(columns, row))
+    return result.rowcount == 1
 
 @router.post("/", response_model=schemas.Session)
 async def create_session(
@@ -91,36 +132,37 @@ async def create_session(
     current_user: models.User = Depends(get_current_user)
 ):
     """Create a new user session"""
-    # Check concurrent session limit
-    if not check_concurrent_session_limit(str(current_user.id), db):
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail="Maximum concurrent sessions exceeded"
-        )
+    now = datetime.now(timezone.utc)
 
     # Extract device information
     device_info = extract_device_info(request)
     fingerprint = create_session_fingerprint(device_info)
 
-    # Create session
+    # Create session, enforcing the concurrent session limit in the same statement
     session_id = generate_session_id()
-    expires_at = datetime.utcnow() + timedelta(hours=8)  # 8 hours default
-
-    session = models.UserSession(
-        user_id=str(current_user.id),
-        session_id=session_id,
-        device_info=device_info,
-        ip_address=device_info.get("ip_address"),
-        user_agent=device_info.get("user_agent"),
-        is_active=True,
-        expires_at=expires_at
-    )
-
-    db.add(session)
+    expires_at = now + timedelta(hours=8)  # 8 hours default
+
+    created = insert_session_within_limit(db, {
+        "id": str(uuid4()),
+        "user_id": str(current_user.id),
+        "session_id": session_id,
+        "device_info": device_info,
+        "ip_address": device_info.get("ip_address"),
+        "user_agent": device_info.get("user_agent"),
+        "device_fingerprint": fingerprint,
+        "is_active": True,
+        "expires_at": expires_at
+    }, now=now)
+    if not created:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Maximum concurrent sessions exceeded"
+        )
     db.commit()
-    db.refresh(session)
 
-    return schemas.Session.from_orm(session)
+    session = db.query(models.UserSession).filter(models.UserSession.session_id == session_id).one()
+    return schemas.Session.model_validate(session)
 
 @router.get("/", response_model=List[schemas.Session])
 async def list_sessions(
@@ -131,18 +173,18 @@ async def list_sessions(
     current_user: models.User = Depends(get_current_user)
 ):
     """List user sessions"""
-    query = db.query(models.UserSession).filter(
+    query = crud.strict_query(db, models.UserSession).filter(
         models.UserSession.user_id == str(current_user.id)
     )
 
     if active_only:
         query = query.filter(
             models.UserSession.is_active == True,
-            models.UserSession.expires_at > datetime.utcnow()
+            models.UserSession.expires_at > datetime.now(timezone.utc)
         )
 
-    sessions = query.offset(skip).limit(limit).all()
-    return [schemas.Session.from_orm(session) for session in sessions]
+    # response_model validates the rows from attributes and serializes them to JSON in pydantic-core
+    return query.offset(skip).limit(limit).all()
 
 @router.get("/{session_id}", response_model=schemas.Session)
 async def get_session(
@@ -151,7 +193,7 @@ async def get_session(
     current_user: models.User = Depends(get_current_user)
 ):
     """Get session details"""
-    session = db.query(models.UserSession).filter(
+    session = crud.strict_query(db, models.UserSession).filter(
         models.UserSession.session_id == session_id,
         models.UserSession.user_id == str(current_user.id)
     ).first()
@@ -162,7 +204,7 @@ async def get_session(
             detail="Session not found"
         )
 
-    return schemas.Session.from_orm(session)
+    return schemas.Session.model_validate(session)
 
 @router.put("/{session_id}", response_model=schemas.Session)
 async def update_session(
@@ -172,7 +214,7 @@ async def update_session(
     current_user: models.User = Depends(get_current_user)
 ):
     """Update session (extend, activate/deactivate)"""
-    session = db.query(models.UserSession).filter(
+    session = crud.strict_query(db, models.UserSession).filter(
         models.UserSession.session_id == session_id,
         models.UserSession.user_id == str(current_user.id)
     ).first()
@@ -190,12 +232,12 @@ async def update_session(
 
     # If activating, extend expiration
     if session_update.is_active and session_update.is_active == True:
-        session.expires_at = datetime.utcnow() + timedelta(hours=8)
+        session.expires_at = datetime.now(timezone.utc) + timedelta(hours=8)
 
     db.commit()
     db.refresh(session)
 
-    return schemas.Session.from_orm(session)
+    return schemas.Session.model_validate(session)
 
 @router.delete("/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_session(
@@ -204,7 +246,7 @@ async def delete_session(
     current_user: models.User = Depends(get_current_user)
 ):
     """Terminate a specific session"""
-    session = db.query(models.UserSession).filter(
+    session = crud.strict_query(db, models.UserSession).filter(
         models.UserSession.session_id == session_id,
         models.UserSession.user_id == str(current_user.id)
     ).first()
@@ -231,7 +273,7 @@ async def delete_all_sessions(
     db.query(models.UserSession).filter(
         models.UserSession.user_id == str(current_user.id),
         models.UserSession.is_active == True
-    ).update({"is_active": False})
+    ).update({"is_active": False}, synchronize_session=False)
 
     db.commit()
 
@@ -245,7 +287,7 @@ async def extend_session(
     current_user: models.User = Depends(get_current_user)
 ):
     """Extend session expiration"""
-    session = db.query(models.UserSession).filter(
+    session = crud.strict_query(db, models.UserSession).filter(
         models.UserSession.session_id == session_id,
         models.UserSession.user_id == str(current_user.id)
     ).first()
@@ -263,13 +305,14 @@ async def extend_session(
         )
 
     # Extend expiration
-    session.expires_at = datetime.utcnow() + timedelta(minutes=extension_minutes)
-    session.last_activity = datetime.utcnow()
+    now = datetime.now(timezone.utc)
+    session.expires_at = now + timedelta(minutes=extension_minutes)
+    session.last_activity = now
 
     db.commit()
     db.refresh(session)
 
-    return schemas.Session.from_orm(session)
+    return schemas.Session.model_validate(session)
 
 @router.get("/devices/", response_model=List[schemas.DeviceInfo])
 async def list_devices(
@@ -277,26 +320,35 @@ async def list_devices(
     current_user: models.User = Depends(get_current_user)
 ):
     """List unique devices for the user"""
-    # Get distinct device fingerprints and their latest session info
-    sessions = db.query(models.UserSession).filter(
-        models.UserSession.user_id == str(current_user.id)
-    ).order_by(models.UserSession.last_activity.desc()).all()
+    # Latest session per stored device fingerprint, deduplicated in SQL
+    ranked = select(
+        models.UserSession.id,
+        func.row_number().over(
+            partition_by=models.UserSession.device_fingerprint,
+            order_by=models.UserSession.last_activity.desc()
+        ).label("rn")
+    ).where(
+        models.UserSession.user_id == str(current_user.id),
+        models.UserSession.device_fingerprint.isnot(None)
+    ).subquery()
 
-    devices = {}
+    sessions = crud.strict_query(db, models.UserSession).join(
+        ranked, ranked.c.id == models.UserSession.id
+    ).filter(ranked.c.rn == 1).order_by(models.UserSession.last_activity.desc()).all()
+
+    devices = []
     for session in sessions:
         if session.device_info:
-            fingerprint = create_session_fingerprint(session.device_info)
-            if fingerprint not in devices:
-                devices[fingerprint] = {
-                    "device_id": fingerprint,
-                    "device_name": f"{session.device_info.get('device_type', 'Unknown')} - {session.device_info.get('browser', 'Unknown')}",
-                    "device_type": session.device_info.get('device_type'),
-                    "os": session.device_info.get('os'),
-                    "browser": session.device_info.get('browser'),
-                    "is_trusted": False  # In production, this would be stored separately
-                }
-
-    return list(devices.values())
+            devices.append({
+                "device_id": session.device_fingerprint,
+                "device_name": f"{session.device_info.get('device_type', 'Unknown')} - {session.device_info.get('browser', 'Unknown')}",
+                "device_type": session.device_info.get('device_type'),
+                "os": session.device_info.get('os'),
+                "browser": session.device_info.get('browser'),
+                "is_trusted": False  # In production, this would be stored separately
+            })
+
+    return devices
 
 @router.post("/devices/{device_id}/trust", response_model=schemas.DeviceInfo)
 async def trust_device(
@@ -343,52 +395,61 @@ async def cleanup_expired_sessions(
 
     # Mark expired sessions as inactive
     expired_count = db.query(models.UserSession).filter(
-        models.UserSession.expires_at < datetime.utcnow(),
+        models.UserSession.expires_at < datetime.now(timezone.utc),
         models.UserSession.is_active == True
-    ).update({"is_active": False})
+    ).update({"is_active": False}, synchronize_session=False)
 
     db.commit()
 
     return {"message": f"Cleaned up {expired_count} expired sessions"}
 
+# Global session stats change slowly relative to the cost of counting the whole table
+GLOBAL_STATS_TTL = 10  # seconds
+_global_stats_cache: Optional[tuple] = None  # (cached_at, stats)
+
 @router.get("/stats/", response_model=Dict[str, Any])
 async def get_session_stats(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     """Get session statistics for the user"""
+    now = datetime.now(timezone.utc)
+    is_live = and_(
+        models.UserSession.is_active == True,
+        models.UserSession.expires_at > now
+    )
+    # All counters in one pass over user_sessions (CASE rather than FILTER so MySQL works too)
+    stats_query = select(
+        func.count().label("total"),
+        func.count(case((is_live, 1))).label("active"),
+        func.count(case((models.UserSession.expires_at < now, 1))).label("expired")
+    ).select_from(models.UserSession)
+
     if not current_user.is_superuser:
         # Regular users only see their own stats
-        total_sessions = db.query(models.UserSession).filter(
-            models.UserSession.user_id == str(current_user.id)
-        ).count()
-
-        active_sessions = db.query(models.UserSession).filter(
-            models.UserSession.user_id == str(current_user.id),
-            models.UserSession.is_active == True,
-            models.UserSession.expires_at > datetime.utcnow()
-        ).count()
+        counts = db.execute(
+            stats_query.where(models.UserSession.user_id == str(current_user.id))
+        ).one()
 
         return {
-            "total_sessions": total_sessions,
-            "active_sessions": active_sessions,
-            "expired_sessions": total_sessions - active_sessions
+            "total_sessions": counts.total,
+            "active_sessions": counts.active,
+            "expired_sessions": counts.total - counts.active
         }
     else:
-        # Admins see global stats
-        total_sessions = db.query(models.UserSession).count()
-        active_sessions = db.query(models.UserSession).filter(
-            models.UserSession.is_active == True,
-            models.UserSession.expires_at > datetime.utcnow()
-        ).count()
-
-        expired_sessions = db.query(models.UserSession).filter(
-            models.UserSession.expires_at < datetime.utcnow()
-        ).count()
-
-        return {
-            "total_sessions": total_sessions,
-            "active_sessions": active_sessions,
-            "expired_sessions": expired_sessions,
-            "inactive_sessions": total_sessions - active_sessions - expired_sessions
-        }
\ No newline at end of file
+        # Admins see global stats, shared across admins for GLOBAL_STATS_TTL seconds
+        global _global_stats_cache
+        cached_at = time.monotonic()
+        if _global_stats_cache and cached_at - _global_stats_cache[0] < GLOBAL_STATS_TTL:
+            return _global_stats_cache[1]
+
+        counts = db.execute(stats_query).one()
+
+        stats = {
+            "total_sessions": counts.total,
+            "active_sessions": counts.active,
+            "expired_sessions": counts.expired,
+            "inactive_sessions": counts.total - counts.active - counts.expired
+        }
+        _global_stats_cache = (cached_at, stats)
+        return stats
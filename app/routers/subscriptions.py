@@ -1,27 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from math import ceil
+from typing import Optional
 from uuid import UUID
 from app import crud, models, schemas
+from app.cache import cached_count
 from app.database import get_db
 from app.auth import get_current_user
-from fastapi.templating import Jinja2Templates
-
-templates = Jinja2Templates(directory="app/templates")
-templates.env.globals.update(min=min, max=max)
+from app.routers._common import IdPath, page_count, paginate_response
+from app.templating import templates
 
 router = APIRouter()
 
-def paginate_response(items: List, total: int, page: int, size: int) -> schemas.PaginatedResponse:
-    return schemas.PaginatedResponse(
-        items=items,
-        total=total,
-        page=page,
-        size=size,
-        pages=ceil(total / size) if size > 0 else 0
-    )
+def verify_subscription_exists(db: Session, subscription_id: UUID) -> None:
+    (subscription_exists,) = crud.rows_exist(db, models.Subscription.id == str(subscription_id))
+    if not subscription_exists:
+        raise HTTPException(status_code=404, detail="Subscription not found")
 
 @router.post("", response_model=schemas.Subscription)
 def create_subscription(
@@ -29,14 +23,15 @@ def create_subscription(
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # Verify tenant exists
-    tenant = crud.get_tenant(db, subscription.tenant_id)
-    if not tenant:
+    # Verify tenant and plan exist (one round trip)
+    tenant_exists, plan_exists = crud.rows_exist(
+        db,
+        models.Tenant.id == str(subscription.tenant_id),
+        models.PlanDefinition.id == str(subscription.plan_id)
+    )
+    if not tenant_exists:
         raise HTTPException(status_code=404, detail="Tenant not found")
-
-    # Verify plan exists
-    plan = crud.get_plan_definition(db, subscription.plan_id)
-    if not plan:
+    if not plan_exists:
         raise HTTPException(status_code=404, detail="Plan not found")
 
     return crud.create_subscription(db=db, subscription=subscription)
@@ -46,40 +41,54 @@ def read_subscriptions(
     request: Request,
     tenant_id: Optional[UUID] = None,
     page: int = Query(1, ge=1),
-    size: int = Query(10, ge=1, le=200),
+    size: int = Query(10, ge=0, le=200),
+    after: Optional[str] = Query(None, description="Keyset pagination: return subscriptions after this id (empty for the first page)"),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    count_key = ("subscriptions", str(tenant_id) if tenant_id else None)
+
+    # size=0 asks only for the total: skip the row SELECT and answer from the cached count
+    if size == 0:
+        # The HTMX partials render rows, so they keep requiring size >= 1
+        if request.headers.get("HX-Request"):
+            raise HTTPException(status_code=422, detail="size must be at least 1")
+        total = cached_count(count_key, lambda: crud.count_subscriptions(db, tenant_id=tenant_id))
+        return paginate_response(items=[], total=total, page=page, size=size)
+
+    # One fetch for both renderings; only the output format depends on HX-Request
+    next_cursor = None
+    if after is not None:
+        subscriptions, next_cursor = crud.get_subscriptions_after(db, tenant_id=tenant_id, after=after, limit=size)
+        total = cached_count(count_key, lambda: crud.count_subscriptions(db, tenant_id=tenant_id))
+    else:
+        skip = (page - 1) * size
+        subscriptions, total = crud.get_subscriptions_with_total(db, tenant_id=tenant_id, skip=skip, limit=size)
+
     # Check if this is an HTMX request
     if request.headers.get("HX-Request"):
         # Return HTML for HTMX
-        skip = (page - 1) * size
-        subscriptions = crud.get_subscriptions(db, tenant_id=tenant_id, skip=skip, limit=size)
-        total = db.query(models.Subscription).count()
-        pages = ceil(total / size) if size > 0 else 0
-        return templates.TemplateResponse("subscriptions_list.html", {
+        return templates.TemplateResponse(request, "subscriptions_list.html", {
             "request": request,
             "subscriptions": subscriptions,
             "page": page,
             "size": size,
             "total": total,
-            "pages": pages
+            "pages": page_count(total, size)
         })
 
     # Return JSON for API requests
-    skip = (page - 1) * size
-    subscriptions = crud.get_subscriptions_with_details(db, tenant_id=tenant_id, skip=skip, limit=size)
-    total = db.query(models.Subscription).count()
     return paginate_response(
-        items=subscriptions,
+        items=crud.subscription_details(subscriptions),
         total=total,
         page=page,
-        size=size
+        size=size,
+        next_cursor=next_cursor
     )
 
 @router.get("/{subscription_id}", response_model=schemas.Subscription)
 def read_subscription(
-    subscription_id: UUID,
+    subscription_id: IdPath,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -90,8 +99,8 @@ def read_subscription(
 
 @router.put("/{subscription_id}", response_model=schemas.Subscription)
 def update_subscription(
-    subscription_id: UUID,
     subscription: schemas.SubscriptionUpdate,
+    subscription_id: IdPath,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -102,7 +111,7 @@ def update_subscription(
 
 @router.delete("/{subscription_id}")
 def delete_subscription(
-    subscription_id: UUID,
+    subscription_id: IdPath,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -118,14 +127,15 @@ def create_subscription_entitlement(
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # Verify subscription exists
-    subscription = crud.get_subscription(db, subscription_id)
-    if not subscription:
+    # Verify subscription and feature exist (one round trip)
+    subscription_exists, feature_exists = crud.rows_exist(
+        db,
+        models.Subscription.id == str(subscription_id),
+        models.FeatureDefinition.id == str(entitlement.feature_id)
+    )
+    if not subscription_exists:
         raise HTTPException(status_code=404, detail="Subscription not found")
-
-    # Verify feature exists
-    feature = crud.get_feature_definition(db, entitlement.feature_id)
-    if not feature:
+    if not feature_exists:
         raise HTTPException(status_code=404, detail="Feature not found")
 
     # Ensure the entitlement is for this subscription
@@ -136,20 +146,20 @@ def create_subscription_entitlement(
 
 @router.get("/{subscription_id}/entitlements", response_model=schemas.PaginatedResponse)
 def read_subscription_entitlements(
-    subscription_id: UUID,
+    subscription_id: IdPath,
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=200),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # Verify subscription exists
-    subscription = crud.get_subscription(db, subscription_id)
-    if not subscription:
-        raise HTTPException(status_code=404, detail="Subscription not found")
-
     skip = (page - 1) * size
     entitlements = crud.get_subscription_entitlements_with_details(db, subscription_id=subscription_id, skip=skip, limit=size)
-    total = db.query(models.SubscriptionEntitlement).filter(models.SubscriptionEntitlement.subscription_id == str(subscription_id)).count()
+    if not entitlements:
+        verify_subscription_exists(db, subscription_id)
+    total = crud.compute_total(entitlements, skip, size, lambda: cached_count(
+        ("entitlements", subscription_id),
+        db.query(models.SubscriptionEntitlement).filter(models.SubscriptionEntitlement.subscription_id == subscription_id).count
+    ))
     return paginate_response(
         items=entitlements,
         total=total,
@@ -159,35 +169,29 @@ def read_subscription_entitlements(
 
 @router.put("/{subscription_id}/entitlements/{feature_id}", response_model=schemas.SubscriptionEntitlement)
 def update_subscription_entitlement(
-    subscription_id: UUID,
-    feature_id: UUID,
     entitlement: schemas.SubscriptionEntitlementUpdate,
+    subscription_id: IdPath,
+    feature_id: IdPath,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # Verify subscription exists
-    subscription = crud.get_subscription(db, subscription_id)
-    if not subscription:
-        raise HTTPException(status_code=404, detail="Subscription not found")
-
     db_entitlement = crud.update_subscription_entitlement(db, subscription_id=subscription_id, feature_id=feature_id, entitlement_update=entitlement)
     if db_entitlement is None:
+        # Tell a missing subscription apart from a missing entitlement only on the failure path
+        verify_subscription_exists(db, subscription_id)
         raise HTTPException(status_code=404, detail="Entitlement not found")
     return db_entitlement
 
 @router.delete("/{subscription_id}/entitlements/{feature_id}")
 def delete_subscription_entitlement(
-    subscription_id: UUID,
-    feature_id: UUID,
+    subscription_id: IdPath,
+    feature_id: IdPath,
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # Verify subscription exists
-    subscription = crud.get_subscription(db, subscription_id)
-    if not subscription:
-        raise HTTPException(status_code=404, detail="Subscription not found")
-
     success = crud.delete_subscription_entitlement(db, subscription_id=subscription_id, feature_id=feature_id)
     if not success:
+        # Tell a missing subscription apart from a missing entitlement only on the failure path
+        verify_subscription_exists(db, subscription_id)
         raise HTTPException(status_code=404, detail="Entitlement not found")
     return {"message": "Entitlement deleted successfully"}
\ No newline at end of file
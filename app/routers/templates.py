@@ -2,25 +2,18 @@ from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
 from typing import List
-from math import ceil
 from uuid import UUID
 from app import crud, models, schemas
 from app.database import get_db
 from app.auth import get_current_user
-from fastapi.templating import Jinja2Templates
-
-templates = Jinja2Templates(directory="app/templates")
+from app.cache import cached_count
+from app.routers._common import page_count, paginate_response
+from app.templating import templates
+from pydantic import TypeAdapter
 
 router = APIRouter()
 
-def paginate_response(items: List, total: int, page: int, size: int) -> schemas.PaginatedResponse:
-    return schemas.PaginatedResponse(
-        items=items,
-        total=total,
-        page=page,
-        size=size,
-        pages=ceil(total / size) if size > 0 else 0
-    )
+_TEMPLATE_LIST = TypeAdapter(List[schemas.Template])
 
 @router.post("", response_model=schemas.Template)
 def create_template(
@@ -34,18 +27,24 @@ def create_template(
 def read_templates(
     request: Request,
     page: int = Query(1, ge=1),
-    size: int = Query(10, ge=1, le=200),
+    size: int = Query(10, ge=0, le=200),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    # size=0 asks only for the total: skip the row SELECT and answer from the cached count
+    if size == 0:
+        # The HTMX partials render rows, so they keep requiring size >= 1
+        if request.headers.get("HX-Request"):
+            raise HTTPException(status_code=422, detail="size must be at least 1")
+        return paginate_response(items=[], total=cached_count(("templates",), lambda: crud.count_templates(db)), page=page, size=size)
+
     # Check if this is an HTMX request
     if request.headers.get("HX-Request"):
         # Return HTML for HTMX
         skip = (page - 1) * size
-        templates_list = crud.get_templates(db, skip=skip, limit=size)
-        total = db.query(models.Template).count()
-        pages = ceil(total / size) if size > 0 else 0
-        return templates.TemplateResponse("templates_list.html", {
+        templates_list, total = crud.get_templates_with_total(db, skip=skip, limit=size)
+        pages = page_count(total, size)
+        return templates.TemplateResponse(request, "templates_list.html", {
             "request": request,
             "templates": templates_list,
             "page": page,
@@ -56,10 +55,9 @@ def read_templates(
 
     # Return JSON for API requests
     skip = (page - 1) * size
-    templates_list = crud.get_templates(db, skip=skip, limit=size)
-    total = db.query(models.Template).count()
+    templates_list, total = crud.get_templates_with_total(db, skip=skip, limit=size)
     return paginate_response(
-        items=[schemas.Template.model_validate(template) for template in templates_list],
+        items=_TEMPLATE_LIST.validate_python(templates_list, from_attributes=True),
         total=total,
         page=page,
         size=size
@@ -1,27 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from fastapi.responses import HTMLResponse
 from sqlalchemy.orm import Session
-from typing import List
-from math import ceil
+from typing import List, Optional
 from uuid import UUID
 from app import crud, models, schemas
+from app.cache import cached_count, tenant_page_cache
 from app.database import get_db
 from app.auth import get_current_user
-from fastapi.templating import Jinja2Templates
-
-templates = Jinja2Templates(directory="app/templates")
-templates.env.globals.update(min=min, max=max)
+from app.routers._common import IdPath, page_count, paginate_response
+from app.templating import templates
+from pydantic import TypeAdapter
 
 router = APIRouter()
 
-def paginate_response(items: List, total: int, page: int, size: int) -> schemas.PaginatedResponse:
-    return schemas.PaginatedResponse(
-        items=items,
-        total=total,
-        page=page,
-        size=size,
-        pages=ceil(total / size) if size > 0 else 0
-    )
+_TENANT_LIST = TypeAdapter(List[schemas.Tenant])
+
+def verify_tenant_exists(db: Session, tenant_id: UUID) -> None:
+    (tenant_exists,) = crud.rows_exist(db, models.Tenant.id == str(tenant_id))
+    if not tenant_exists:
+        raise HTTPException(status_code=404, detail="Tenant not found")
 
 @router.post("", response_model=schemas.Tenant)
 def create_tenant(
@@ -38,18 +35,24 @@ def create_tenant(
 def read_tenants(
     request: Request,
     page: int = Query(1, ge=1),
-    size: int = Query(10, ge=1, le=200),
+    size: int = Query(10, ge=0, le=200),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    # size=0 asks only for the total: skip the row SELECT and answer from the cached count
+    if size == 0:
+        # The HTMX partials render rows, so they keep requiring size >= 1
+        if request.headers.get("HX-Request"):
+            raise HTTPException(status_code=422, detail="size must be at least 1")
+        return paginate_response(items=[], total=cached_count(("tenants",), lambda: crud.count_tenants(db)), page=page, size=size)
+
     # Check if this is an HTMX request
     if request.headers.get("HX-Request"):
         # Return HTML for HTMX
         skip = (page - 1) * size
-        tenants = crud.get_tenants(db, skip=skip, limit=size)
-        total = db.query(models.Tenant).count()
-        pages = ceil(total / size) if size > 0 else 0
-        return templates.TemplateResponse("tenants_list.html", {
+        tenants, total = crud.get_tenants_with_total(db, skip=skip, limit=size)
+        pages = page_count(total, size)
+        return templates.TemplateResponse(request, "tenants_list.html", {
             "request": request,
             "tenants": tenants,
             "page": page,
@@ -60,10 +63,9 @@ def read_tenants(
 
     # Return JSON for API requests
     skip = (page - 1) * size
-    tenants = crud.get_tenants(db, skip=skip, limit=size)
-    total = db.query(models.Tenant).count()
+    tenants, total = crud.get_tenants_with_total(db, skip=skip, limit=size)
     return paginate_response(
-        items=[schemas.Tenant.model_validate(tenant) for tenant in tenants],
+        items=_TENANT_LIST.validate_python(tenants, from_attributes=True),
         total=total,
         page=page,
         size=size
@@ -103,23 +105,65 @@ def delete_tenant(
         raise HTTPException(status_code=404, detail="Tenant not found")
     return {"message": "Tenant deleted successfully"}
 
+def tenant_page(db: Session, tenant_id: str, resource: str, position, size: int, fetch) -> tuple:
+    """A tenant sub-resource page, cached for TENANT_PAGE_TTL seconds.
+
+    position is the OFFSET or the keyset cursor. fetch() returns a tuple whose first element is the
+    page items, as plain data (dicts or schemas), never ORM rows bound to this request's session.
+    """
+    result = tenant_page_cache.get_or_set((tenant_id, resource, position, size), fetch)
+    if not result[0]:
+        verify_tenant_exists(db, tenant_id)
+    return result
+
+def _tenant_subscriptions(db: Session, tenant_id: str, skip: int, size: int) -> tuple:
+    subscriptions, total = crud.get_subscriptions_with_total(db, tenant_id=tenant_id, skip=skip, limit=size)
+    return crud.subscription_details(subscriptions), total
+
+def _tenant_subscriptions_after(db: Session, tenant_id: str, after: str, size: int) -> tuple:
+    subscriptions, next_cursor = crud.get_subscriptions_after(db, tenant_id=tenant_id, after=after, limit=size)
+    return crud.subscription_details(subscriptions), crud.count_subscriptions(db, tenant_id=tenant_id), next_cursor
+
+def _tenant_licenses_after(db: Session, tenant_id: str, after: str, size: int) -> tuple:
+    licenses, next_cursor = crud.get_licenses_with_tenant_after(db, after=after, limit=size, tenant_id=tenant_id)
+    return licenses, crud.get_tenant_license_count(db, tenant_id), next_cursor
+
+def _tenant_products(db: Session, tenant_id: str, skip: int, size: int) -> tuple:
+    products, total = crud.get_tenant_products_with_total(db, tenant_id=tenant_id, skip=skip, limit=size)
+
+    # Convert to dict format
+    product_dicts = []
+    for product in products:
+        product_dicts.append({
+            "id": product.id,
+            "name": product.name,
+            "description": product.description,
+            "version": product.version
+        })
+    return product_dicts, total
+
 @router.get("/{tenant_id}/licenses", response_model=schemas.PaginatedResponse)
 def get_tenant_licenses(
-    tenant_id: UUID,
+    tenant_id: IdPath,
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=200),
+    after: Optional[str] = Query(None, description="Keyset pagination: return licenses after this id (empty for the first page)"),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all licenses for a specific tenant."""
-    # Verify tenant exists
-    tenant = crud.get_tenant(db, tenant_id=tenant_id)
-    if not tenant:
-        raise HTTPException(status_code=404, detail="Tenant not found")
+    if after is not None:
+        licenses, total, next_cursor = tenant_page(db, tenant_id, "licenses", ("after", after), size, lambda: _tenant_licenses_after(db, tenant_id, after, size))
+        return paginate_response(
+            items=licenses,
+            total=total,
+            page=page,
+            size=size,
+            next_cursor=next_cursor
+        )
 
     skip = (page - 1) * size
-    licenses = crud.get_licenses_with_tenant(db, skip=skip, limit=size, tenant_id=tenant_id)
-    total = db.query(models.License).filter(models.License.tenant_id == str(tenant_id)).count()
+    licenses, total = tenant_page(db, tenant_id, "licenses", skip, size, lambda: crud.get_licenses_with_tenant_and_total(db, skip=skip, limit=size, tenant_id=tenant_id))
     return paginate_response(
         items=licenses,
         total=total,
@@ -129,21 +173,26 @@ def get_tenant_licenses(
 
 @router.get("/{tenant_id}/subscriptions", response_model=schemas.PaginatedResponse)
 def get_tenant_subscriptions(
-    tenant_id: UUID,
+    tenant_id: IdPath,
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=200),
+    after: Optional[str] = Query(None, description="Keyset pagination: return subscriptions after this id (empty for the first page)"),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all subscriptions for a specific tenant."""
-    # Verify tenant exists
-    tenant = crud.get_tenant(db, tenant_id=tenant_id)
-    if not tenant:
-        raise HTTPException(status_code=404, detail="Tenant not found")
+    if after is not None:
+        subscriptions, total, next_cursor = tenant_page(db, tenant_id, "subscriptions", ("after", after), size, lambda: _tenant_subscriptions_after(db, tenant_id, after, size))
+        return paginate_response(
+            items=subscriptions,
+            total=total,
+            page=page,
+            size=size,
+            next_cursor=next_cursor
+        )
 
     skip = (page - 1) * size
-    subscriptions = crud.get_subscriptions_with_details(db, tenant_id=tenant_id, skip=skip, limit=size)
-    total = db.query(models.Subscription).filter(models.Subscription.tenant_id == str(tenant_id)).count()
+    subscriptions, total = tenant_page(db, tenant_id, "subscriptions", skip, size, lambda: _tenant_subscriptions(db, tenant_id, skip, size))
     return paginate_response(
         items=subscriptions,
         total=total,
@@ -153,49 +202,17 @@ def get_tenant_subscriptions(
 
 @router.get("/{tenant_id}/products", response_model=schemas.PaginatedResponse)
 def get_tenant_products(
-    tenant_id: UUID,
+    tenant_id: IdPath,
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=200),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all products that have plans with subscriptions for a specific tenant."""
-    # Verify tenant exists
-    tenant = crud.get_tenant(db, tenant_id=tenant_id)
-    if not tenant:
-        raise HTTPException(status_code=404, detail="Tenant not found")
-
-    # Get distinct product IDs from tenant's subscriptions
-    from sqlalchemy import distinct
-    product_ids = db.query(distinct(models.Subscription.plan_id)).filter(
-        models.Subscription.tenant_id == str(tenant_id)
-    ).subquery()
-
-    plan_ids = db.query(distinct(models.PlanDefinition.product_id)).filter(
-        models.PlanDefinition.id.in_(product_ids)
-    ).subquery()
-
     skip = (page - 1) * size
-    products = db.query(models.Product).filter(
-        models.Product.id.in_(plan_ids)
-    ).offset(skip).limit(size).all()
-
-    total = db.query(models.Product).filter(
-        models.Product.id.in_(plan_ids)
-    ).count()
-
-    # Convert to dict format
-    product_dicts = []
-    for product in products:
-        product_dicts.append({
-            "id": product.id,
-            "name": product.name,
-            "description": product.description,
-            "version": product.version
-        })
-
+    products, total = tenant_page(db, tenant_id, "products", skip, size, lambda: _tenant_products(db, tenant_id, skip, size))
     return paginate_response(
-        items=product_dicts,
+        items=products,
         total=total,
         page=page,
         size=size
@@ -203,38 +220,17 @@ def get_tenant_products(
 
 @router.get("/{tenant_id}/plans", response_model=schemas.PaginatedResponse)
 def get_tenant_plans(
-    tenant_id: UUID,
+    tenant_id: IdPath,
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=200),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all plans that have subscriptions for a specific tenant."""
-    # Verify tenant exists
-    tenant = crud.get_tenant(db, tenant_id=tenant_id)
-    if not tenant:
-        raise HTTPException(status_code=404, detail="Tenant not found")
-
-    # Get plan IDs from tenant's subscriptions
-    plan_ids_query = db.query(models.Subscription.plan_id).filter(
-        models.Subscription.tenant_id == str(tenant_id)
-    ).distinct()
-
-    plan_ids = [str(pid) for pid, in plan_ids_query.all()]
-
     skip = (page - 1) * size
-    # Get all plans with product info, then filter
-    all_plans = crud.get_plan_definitions_with_product(db, skip=0, limit=1000)  # Get more to filter
-    filtered_plans = [plan for plan in all_plans if plan["id"] in plan_ids]
-
-    # Apply pagination to filtered results
-    total = len(filtered_plans)
-    start_idx = skip
-    end_idx = min(start_idx + size, total)
-    paginated_plans = filtered_plans[start_idx:end_idx]
-
+    plans, total = tenant_page(db, tenant_id, "plans", skip, size, lambda: crud.get_tenant_plans_with_product(db, tenant_id=tenant_id, skip=skip, limit=size))
     return paginate_response(
-        items=paginated_plans,
+        items=plans,
         total=total,
         page=page,
         size=size
@@ -242,43 +238,17 @@ def get_tenant_plans(
 
 @router.get("/{tenant_id}/features", response_model=schemas.PaginatedResponse)
 def get_tenant_features(
-    tenant_id: UUID,
+    tenant_id: IdPath,
     page: int = Query(1, ge=1),
     size: int = Query(10, ge=1, le=200),
     current_user: models.User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get all features that are in plans with subscriptions for a specific tenant."""
-    # Verify tenant exists
-    tenant = crud.get_tenant(db, tenant_id=tenant_id)
-    if not tenant:
-        raise HTTPException(status_code=404, detail="Tenant not found")
-
-    # Get plan IDs from tenant's subscriptions
-    plan_ids_query = db.query(models.Subscription.plan_id).filter(
-        models.Subscription.tenant_id == str(tenant_id)
-    ).distinct()
-    plan_ids = [str(pid) for pid, in plan_ids_query.all()]
-
-    # Get product IDs from those plans
-    product_ids_query = db.query(models.PlanDefinition.product_id).filter(
-        models.PlanDefinition.id.in_(plan_ids)
-    ).distinct()
-    product_ids = [str(pid) for pid, in product_ids_query.all()]
-
     skip = (page - 1) * size
-    # Get all features with product info, then filter
-    all_features = crud.get_feature_definitions_with_product(db, skip=0, limit=1000)  # Get more to filter
-    filtered_features = [feature for feature in all_features if feature["product_id"] in product_ids]
-
-    # Apply pagination to filtered results
-    total = len(filtered_features)
-    start_idx = skip
-    end_idx = min(start_idx + size, total)
-    paginated_features = filtered_features[start_idx:end_idx]
-
+    features, total = tenant_page(db, tenant_id, "features", skip, size, lambda: crud.get_tenant_features_with_product(db, tenant_id=tenant_id, skip=skip, limit=size))
     return paginate_response(
-        items=paginated_features,
+        items=features,
         total=total,
         page=page,
         size=size
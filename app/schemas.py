@@ -1,8 +1,22 @@
-from pydantic import BaseModel, Field, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 from typing import Optional, Any, Dict, Union, Literal
 from datetime import datetime, timezone
 from enum import Enum
 
+def _parse_utc_datetime(v):
+    """Parse an ISO 8601 string (a trailing 'Z' included) into an aware datetime, assuming UTC when naive."""
+    if isinstance(v, str):
+        # fromisoformat accepts 'Z' natively since Python 3.11, so no replace() copy is needed
+        dt = datetime.fromisoformat(v)
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt
+    return v
+
+class _ORMBase(BaseModel):
+    """Base for response schemas built from ORM rows."""
+    model_config = ConfigDict(from_attributes=True)
+
 # Tenant schemas
 class TenantBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
@@ -19,13 +33,10 @@ class TenantUpdate(BaseModel):
     is_active: Optional[bool] = None
     max_licenses: Optional[int] = Field(None, gt=0)
 
-class Tenant(TenantBase):
+class Tenant(TenantBase, _ORMBase):
     id: str
     created_at: datetime
 
-    class Config:
-        from_attributes = True
-
 # Template schemas
 class TemplateBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
@@ -44,17 +55,13 @@ class TemplateUpdate(BaseModel):
     validation_rules: Optional[Dict[str, Any]] = None
     is_active: Optional[bool] = None
 
-class Template(TemplateBase):
+class Template(TemplateBase, _ORMBase):
     id: str
     created_at: datetime
 
-    class Config:
-        from_attributes = True
-
 # License schemas
-class LicenseBase(BaseModel):
-    license_key: str = Field(..., description="Public license key for customer")
-    license_secret: str = Field(..., description="Private cryptographic key for server")
+class _LicenseFields(BaseModel):
+    """Fields shared by the stored license, the API create payload and the UI form."""
     tenant_id: str
     template_id: Optional[str] = None
     linked_subscription: Optional[str] = None  # Optional link to subscription
@@ -62,35 +69,15 @@ class LicenseBase(BaseModel):
     validity_days: Optional[int] = Field(None, gt=0, description="Number of days the license is valid")
     payload: Dict[str, Any]  # Contains custom license data
 
-class LicenseCreate(BaseModel):
-    tenant_id: str
-    template_id: Optional[str] = None
-    linked_subscription: Optional[str] = None  # Optional link to subscription
-    issued_at: Optional[datetime] = None
-    validity_days: Optional[int] = Field(None, gt=0, description="Number of days the license is valid")
-    payload: Dict[str, Any]  # Contains custom license data
+class LicenseBase(_LicenseFields):
+    license_key: str = Field(..., description="Public license key for customer")
+    license_secret: str = Field(..., description="Private cryptographic key for server")
 
+class LicenseCreate(_LicenseFields):
     @field_validator('issued_at', mode='before')
     @classmethod
     def parse_datetime(cls, v):
-        if v is None:
-            return v
-        if isinstance(v, str):
-            # Handle various datetime formats
-            try:
-                # Try standard ISO format first
-                dt = datetime.fromisoformat(v.replace('Z', '+00:00'))
-            except ValueError:
-                # Try alternative parsing
-                if v.endswith('Z'):
-                    v = v[:-1] + '+00:00'
-                dt = datetime.fromisoformat(v)
-
-            # Ensure the datetime has UTC timezone
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            return dt
-        return v
+        return _parse_utc_datetime(v)
 
     @field_validator('linked_subscription', mode='after')
     @classmethod
@@ -121,24 +108,7 @@ class LicenseUpdate(BaseModel):
     @field_validator('issued_at', mode='before')
     @classmethod
     def parse_datetime(cls, v):
-        if v is None:
-            return v
-        if isinstance(v, str):
-            # Handle various datetime formats
-            try:
-                # Try standard ISO format first
-                dt = datetime.fromisoformat(v.replace('Z', '+00:00'))
-            except ValueError:
-                # Try alternative parsing
-                if v.endswith('Z'):
-                    v = v[:-1] + '+00:00'
-                dt = datetime.fromisoformat(v)
-
-            # Ensure the datetime has UTC timezone
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            return dt
-        return v
+        return _parse_utc_datetime(v)
 
     @field_validator('linked_subscription', mode='after')
     @classmethod
@@ -155,14 +125,11 @@ class LicenseUpdate(BaseModel):
 
         return v
 
-class License(LicenseBase):
+class License(LicenseBase, _ORMBase):
     id: str
 
-    class Config:
-        from_attributes = True
-
 # License response schema (excludes sensitive license_secret)
-class LicenseResponse(BaseModel):
+class LicenseResponse(_ORMBase):
     id: str
     license_key: str = Field(..., description="Public license key for customer")
     tenant_id: str
@@ -173,17 +140,9 @@ class LicenseResponse(BaseModel):
     validity_days: Optional[int] = Field(None, gt=0, description="Number of days the license is valid")
     payload: Dict[str, Any]  # Contains custom license data
 
-    class Config:
-        from_attributes = True
-
 # Form schemas for UI
-class LicenseForm(BaseModel):
-    tenant_id: str
-    template_id: Optional[str] = None
-    linked_subscription: Optional[str] = None
-    issued_at: Optional[datetime] = None  # Changed from issue_date to issued_at
-    validity_days: Optional[int] = Field(None, gt=0, description="Number of days the license is valid")
-    payload: Dict[str, Any]  # Custom license data
+class LicenseForm(_LicenseFields):
+    pass
 
 # User schemas
 class UserBase(BaseModel):
@@ -224,15 +183,12 @@ class UserUpdate(BaseModel):
     bio: Optional[str] = Field(None, description="User biography")
     phone_number: Optional[str] = Field(None, description="User's phone number")
 
-class User(UserBase):
+class User(UserBase, _ORMBase):
     id: str
     created_at: datetime
     updated_at: datetime
     last_login: Optional[datetime] = None
 
-    class Config:
-        from_attributes = True
-
 # Authentication schemas
 class LoginRequest(BaseModel):
     username: str = Field(..., description="Username or email")
@@ -278,6 +234,7 @@ class PaginatedResponse(BaseModel):
     page: int
     size: int
     pages: int
+    next_cursor: Optional[str] = None
 
 # Enums for subscription models
 class BillingInterval(str, Enum):
@@ -310,12 +267,9 @@ class ProductUpdate(BaseModel):
     description: Optional[str] = None
     version: Optional[int] = Field(None, ge=1)
 
-class Product(ProductBase):
+class Product(ProductBase, _ORMBase):
     id: str
 
-    class Config:
-        from_attributes = True
-
 # PlanDefinition schemas
 class PlanDefinitionBase(BaseModel):
     product_id: str
@@ -336,12 +290,9 @@ class PlanDefinitionUpdate(BaseModel):
     is_active: Optional[bool] = None
     plan_metadata: Optional[Dict[str, Any]] = None
 
-class PlanDefinition(PlanDefinitionBase):
+class PlanDefinition(PlanDefinitionBase, _ORMBase):
     id: str
 
-    class Config:
-        from_attributes = True
-
 # FeatureDefinition schemas
 class FeatureDefinitionBase(BaseModel):
     product_id: str
@@ -360,12 +311,9 @@ class FeatureDefinitionUpdate(BaseModel):
     default_value: Optional[Any] = None
     validation_rules: Optional[Dict[str, Any]] = None
 
-class FeatureDefinition(FeatureDefinitionBase):
+class FeatureDefinition(FeatureDefinitionBase, _ORMBase):
     id: str
 
-    class Config:
-        from_attributes = True
-
 # PlanFeature schemas
 class PlanFeatureBase(BaseModel):
     plan_id: str
@@ -380,9 +328,8 @@ class PlanFeatureUpdate(BaseModel):
     override_value: Optional[Any] = None
     constraints: Optional[Dict[str, Any]] = None
 
-class PlanFeature(PlanFeatureBase):
-    class Config:
-        from_attributes = True
+class PlanFeature(PlanFeatureBase, _ORMBase):
+    pass
 
 # Subscription schemas
 class SubscriptionBase(BaseModel):
@@ -413,12 +360,9 @@ class SubscriptionUpdate(BaseModel):
     auto_renew: Optional[bool] = None
     payment_provider_id: Optional[str] = None
 
-class Subscription(SubscriptionBase):
+class Subscription(SubscriptionBase, _ORMBase):
     id: str
 
-    class Config:
-        from_attributes = True
-
 # SubscriptionEntitlement schemas
 class SubscriptionEntitlementBase(BaseModel):
     subscription_id: str
@@ -435,9 +379,8 @@ class SubscriptionEntitlementUpdate(BaseModel):
     effective_value: Optional[Any] = None
     overridden: Optional[bool] = None
 
-class SubscriptionEntitlement(SubscriptionEntitlementBase):
-    class Config:
-        from_attributes = True
+class SubscriptionEntitlement(SubscriptionEntitlementBase, _ORMBase):
+    pass
 
 # OAuth2/OIDC schemas
 class OAuthClientBase(BaseModel):
@@ -465,15 +408,12 @@ class OAuthClientUpdate(BaseModel):
     tenant_id: Optional[str] = None
     is_active: Optional[bool] = None
 
-class OAuthClient(OAuthClientBase):
+class OAuthClient(OAuthClientBase, _ORMBase):
     id: str
     client_id: str
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True
-
 # OAuth2 Token schemas
 class TokenResponse(BaseModel):
     access_token: str
@@ -561,7 +501,7 @@ class SessionUpdate(BaseModel):
     is_active: Optional[bool] = None
     device_info: Optional[Dict[str, Any]] = None
 
-class Session(SessionBase):
+class Session(SessionBase, _ORMBase):
     id: str
     user_id: str
     session_id: str
@@ -569,9 +509,6 @@ class Session(SessionBase):
     last_activity: datetime
     expires_at: datetime
 
-    class Config:
-        from_attributes = True
-
 class DeviceInfo(BaseModel):
     device_id: Optional[str] = None
     device_name: Optional[str] = None
@@ -602,14 +539,11 @@ class PermissionUpdate(BaseModel):
     action: Optional[str] = Field(None, min_length=1, max_length=50)
     description: Optional[str] = None
 
-class Permission(PermissionBase):
+class Permission(PermissionBase, _ORMBase):
     id: str
     is_system: bool
     created_at: datetime
 
-    class Config:
-        from_attributes = True
-
 class RoleBase(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
     description: Optional[str] = None
@@ -623,12 +557,9 @@ class RoleUpdate(BaseModel):
     description: Optional[str] = None
     tenant_id: Optional[str] = None
 
-class Role(RoleBase):
+class Role(RoleBase, _ORMBase):
     id: str
     is_system: bool
     created_at: datetime
     updated_at: datetime
     permissions: list[Permission] = []
-
-    class Config:
-        from_attributes = True
@@ -0,0 +1,12 @@
+import os
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+
+# One template environment shared by the routers, so each template is compiled once per worker
+templates = Jinja2Templates(directory="app/templates")
+templates.env.globals.update(min=min, max=max)
+
+# Outside development, skip per-render template mtime checks and reuse compiled bytecode across workers
+if os.getenv("TEMPLATES_AUTO_RELOAD", "false").lower() != "true":
+    templates.env.auto_reload = False
+    templates.env.bytecode_cache = FileSystemBytecodeCache()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Migration script to add device_fingerprint to user_sessions so list_devices can deduplicate in SQL
+"""
+
+import os
+import json
+import hashlib
+import logging
+from sqlalchemy import create_engine, inspect, text
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Database URL - default to SQLite for development
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sigma_permit.db")
+
+def create_session_fingerprint(device_info):
+    """Same fingerprint as app.routers.sessions.create_session_fingerprint, without importing the app"""
+    fields = (device_info.get(name) or "" for name in ("user_agent", "ip_address", "device_type", "os", "browser"))
+    return hashlib.sha256("\0".join(fields).encode()).hexdigest()
+
+def add_device_fingerprint_column(engine):
+    """Add device_fingerprint column to user_sessions and backfill existing rows"""
+    logger.info("Adding device_fingerprint column to user_sessions table...")
+
+    # create_all already adds both on fresh databases, and the migration may be re-run
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("user_sessions")}
+    indexes = {index["name"] for index in inspector.get_indexes("user_sessions")}
+
+    with engine.connect() as conn:
+        if "device_fingerprint" in columns:
+            logger.info("device_fingerprint column already exists, skipping")
+        else:
+            conn.execute(text("ALTER TABLE user_sessions ADD COLUMN device_fingerprint VARCHAR(64)"))
+            conn.commit()
+
+        if "idx_user_sessions_user_fingerprint" in indexes:
+            logger.info("idx_user_sessions_user_fingerprint already exists, skipping")
+        else:
+            # Plain CREATE INDEX: MySQL has no IF NOT EXISTS for indexes, and the check above covers re-runs
+            conn.execute(text(
+                "CREATE INDEX idx_user_sessions_user_fingerprint "
+                "ON user_sessions(user_id, device_fingerprint)"
+            ))
+            conn.commit()
+
+    # Backfill with the same fingerprint the application computes at insert time
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT id, device_info FROM user_sessions WHERE device_fingerprint IS NULL AND device_info IS NOT NULL"
+        )).fetchall()
+
+        updated = 0
+        for session_id, device_info in rows:
+            if isinstance(device_info, str):
+                device_info = json.loads(device_info)
+            if not device_info:
+                continue
+            conn.execute(
+                text("UPDATE user_sessions SET device_fingerprint = :fingerprint WHERE id = :id"),
+                {"fingerprint": create_session_fingerprint(device_info), "id": session_id}
+            )
+            updated += 1
+        conn.commit()
+
+    logger.info(f"Backfilled device_fingerprint for {updated} sessions")
+
+def run_migration():
+    """Run the migration"""
+    logger.info("Starting device fingerprint migration...")
+    logger.info(f"Database URL: {DATABASE_URL}")
+
+    # Create engine
+    if DATABASE_URL.startswith("sqlite"):
+        from sqlalchemy.pool import StaticPool
+        engine = create_engine(
+            DATABASE_URL,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+    else:
+        engine = create_engine(DATABASE_URL)
+
+    try:
+        add_device_fingerprint_column(engine)
+        logger.info("Migration completed successfully!")
+    except Exception as e:
+        logger.error(f"Migration failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Migration script to add a partial index on active sessions' expires_at for the expired-session sweep
+"""
+
+import os
+import logging
+from sqlalchemy import create_engine, inspect, text
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Database URL - default to SQLite for development
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sigma_permit.db")
+
+def add_expiry_index(engine):
+    """Index expires_at over active sessions only (full index where partial indexes are unsupported)"""
+    logger.info("Adding idx_user_sessions_active_expires to user_sessions table...")
+
+    # Plain CREATE INDEX (MySQL) fails when re-run, so check for the index first on every dialect
+    existing = {index["name"] for index in inspect(engine).get_indexes("user_sessions")}
+    if "idx_user_sessions_active_expires" in existing:
+        logger.info("idx_user_sessions_active_expires already exists, skipping")
+        return
+
+    with engine.connect() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_user_sessions_active_expires "
+                "ON user_sessions(expires_at) WHERE is_active = true"
+            ))
+        elif engine.dialect.name == "sqlite":
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS idx_user_sessions_active_expires "
+                "ON user_sessions(expires_at) WHERE is_active = 1"
+            ))
+        else:
+            conn.execute(text(
+                "CREATE INDEX idx_user_sessions_active_expires ON user_sessions(expires_at)"
+            ))
+        conn.commit()
+
+    logger.info("Session expiry index added successfully!")
+
+def run_migration():
+    """Run the migration"""
+    logger.info("Starting session expiry index migration...")
+    logger.info(f"Database URL: {DATABASE_URL}")
+
+    # Create engine
+    if DATABASE_URL.startswith("sqlite"):
+        from sqlalchemy.pool import StaticPool
+        engine = create_engine(
+            DATABASE_URL,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+    else:
+        engine = create_engine(DATABASE_URL)
+
+    try:
+        add_expiry_index(engine)
+        logger.info("Migration completed successfully!")
+    except Exception as e:
+        logger.error(f"Migration failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_migration()
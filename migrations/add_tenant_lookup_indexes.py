@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Migration script to index the tenant_id filters used by the tenant license and subscription lists
+"""
+
+import os
+import logging
+from sqlalchemy import create_engine, inspect, text
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Database URL - default to SQLite for development
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sigma_permit.db")
+
+# subscription_entitlements needs no index: subscription_id leads its primary key
+INDEXES = (
+    ("ix_licenses_tenant_id", "licenses", ("tenant_id",)),
+    ("idx_subscriptions_tenant_plan", "subscriptions", ("tenant_id", "plan_id")),
+)
+
+def has_covering_index(inspector, table, name, columns):
+    """True when the index already exists, or another index leads with the same columns
+    (e.g. the one InnoDB creates for the licenses.tenant_id foreign key on MySQL)"""
+    for index in inspector.get_indexes(table):
+        if index["name"] == name or tuple(index["column_names"][:len(columns)]) == columns:
+            return True
+    return False
+
+def add_tenant_lookup_indexes(engine):
+    """Create the indexes, without blocking writes on PostgreSQL"""
+    logger.info("Adding tenant lookup indexes to licenses and subscriptions tables...")
+
+    inspector = inspect(engine)
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for name, table, columns in INDEXES:
+            if has_covering_index(inspector, table, name, columns):
+                logger.info(f"{table}({', '.join(columns)}) is already indexed, skipping {name}")
+                continue
+            column_list = ", ".join(columns)
+            if engine.dialect.name == "postgresql":
+                conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table}({column_list})"))
+            elif engine.dialect.name == "sqlite":
+                conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table}({column_list})"))
+            else:
+                conn.execute(text(f"CREATE INDEX {name} ON {table}({column_list})"))
+            logger.info(f"Created {name}")
+
+    logger.info("Tenant lookup indexes added successfully!")
+
+def run_migration():
+    """Run the migration"""
+    logger.info("Starting tenant lookup index migration...")
+    logger.info(f"Database URL: {DATABASE_URL}")
+
+    # Create engine
+    if DATABASE_URL.startswith("sqlite"):
+        from sqlalchemy.pool import StaticPool
+        engine = create_engine(
+            DATABASE_URL,
+            connect_args={"check_same_thread": False},
+            poolclass=StaticPool
+        )
+    else:
+        engine = create_engine(DATABASE_URL)
+
+    try:
+        add_tenant_lookup_indexes(engine)
+        logger.info("Migration completed successfully!")
+    except Exception as e:
+        logger.error(f"Migration failed: {e}")
+        raise
+
+if __name__ == "__main__":
+    run_migration()
@@ -130,7 +130,7 @@ def validate_license():
             url = "https://your-api-domain.com/api/licenses/issue"
             params = {"encoded_license_key": encoded_key}
 
-            response = requests.get(url, params=params)
+            response = requests.get(url, params=params, timeout=15)
             response.raise_for_status()
 
             with open(license_file, 'wb') as f: